@@ -1,14 +1,156 @@
 """The Medicine Tracker integration."""
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+from datetime import timedelta
+import logging
+import os
+import time
+from typing import Any
+
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_platform import async_get_platforms
 from homeassistant.util import dt as dt_util
-from .const import DOMAIN
+from .const import (
+    DOMAIN, CONF_MEDICINES, CONF_RULE_ACTION, CONF_SCHEDULE_SOURCE, CONF_TZ_SENSOR,
+    RULE_ACTION_BLOCK
+)
+from .doselog import MAX_READ, DoseLog, log_path
+from .ingest import group_events
+from .models import SCHEMA_VERSION, Medicine, migrate_medicines
+from .regimen import (
+    add_medicines, async_apply, entry_medicines, parse_regimen, shift_times
+)
+from .rules import RuleIndex
+from .sources import SourceSnapshot, async_load_source, async_track_source
+from .zone import ZoneTracker, zone_store
+
+_LOGGER = logging.getLogger(__name__)
 
 SERVICE_TAKE = "take_medicine"
 SERVICE_RESET = "reset_history"
+SERVICE_LOG_DOSES = "log_doses"
+SERVICE_IMPORT_REGIMEN = "import_regimen"
+SERVICE_CLONE_MEDICINES = "clone_medicines"
+SERVICE_SHIFT_TIMES = "shift_times"
+SERVICE_SNOOZE = "snooze_medicine"
+SERVICE_SKIP = "skip_dose"
+SERVICE_READ_LOG = "read_log"
+
+ATTR_EVENTS = "events"
+ATTR_TIME_TAKEN = "time_taken"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_TARGET_ENTRY_ID = "target_entry_id"
+ATTR_REGIMEN = "regimen"
+ATTR_REPLACE = "replace"
+ATTR_MINUTES = "minutes"
+ATTR_DURATION = "duration"
+ATTR_CURSOR = "cursor"
+ATTR_LIMIT = "limit"
+
+DEFAULT_SNOOZE = timedelta(minutes=15)
+
+LOG_DOSES_SCHEMA = vol.Schema({
+    vol.Required(ATTR_EVENTS): vol.All(cv.ensure_list, [
+        vol.Schema({
+            vol.Required("entity_id"): cv.entity_id,
+            vol.Required(ATTR_TIME_TAKEN): cv.datetime,
+        })
+    ]),
+})
+
+IMPORT_REGIMEN_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_REGIMEN): vol.Any(cv.string, list, dict),
+    vol.Optional(ATTR_REPLACE, default=False): cv.boolean,
+})
+
+CLONE_MEDICINES_SCHEMA = vol.Schema({
+    vol.Required("entity_id"): cv.entity_ids,
+    vol.Required(ATTR_TARGET_ENTRY_ID): cv.string,
+}, extra=vol.ALLOW_EXTRA)
+
+SHIFT_TIMES_SCHEMA = vol.Schema({
+    vol.Required("entity_id"): cv.entity_ids,
+    vol.Required(ATTR_MINUTES): vol.All(vol.Coerce(int), vol.Range(min=-720, max=720)),
+}, extra=vol.ALLOW_EXTRA)
+
+SNOOZE_SCHEMA = vol.Schema({
+    vol.Required("entity_id"): cv.entity_ids,
+    vol.Optional(ATTR_DURATION, default=DEFAULT_SNOOZE): cv.positive_time_period,
+}, extra=vol.ALLOW_EXTRA)
+
+SKIP_SCHEMA = vol.Schema({
+    vol.Required("entity_id"): cv.entity_ids,
+}, extra=vol.ALLOW_EXTRA)
+
+READ_LOG_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_CURSOR, default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    vol.Optional(ATTR_LIMIT, default=1000): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=MAX_READ)
+    ),
+})
+
+
+def _get_entry(hass: HomeAssistant, entry_id: str) -> ConfigEntry:
+    """Return a Medicine Tracker config entry or raise a validation error."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(f"Unknown Medicine Tracker entry: {entry_id}")
+    return entry
+
+
+def _medicines_by_entry(hass: HomeAssistant, entity_ids: list[str]) -> dict[str, list[str]]:
+    """Map medicine sensor entity ids to {entry_id: [med_id, ...]}."""
+    registry = er.async_get(hass)
+    result: dict[str, list[str]] = {}
+    for entity_id in entity_ids:
+        entity = registry.async_get(entity_id)
+        if entity is None or entity.platform != DOMAIN or not entity.config_entry_id:
+            raise ServiceValidationError(f"Not a Medicine Tracker sensor: {entity_id}")
+        med_id = entity.unique_id.removeprefix(f"{entity.config_entry_id}_")
+        result.setdefault(entity.config_entry_id, []).append(med_id)
+    return result
+
+
+def _sensors(hass: HomeAssistant, entity_ids: list[str]) -> list[Any]:
+    """Return the loaded medicine sensors among `entity_ids`."""
+    return [
+        entity
+        for platform in async_get_platforms(hass, DOMAIN)
+        for entity in platform.entities.values()
+        if entity.entity_id in entity_ids and hasattr(entity, "mark_taken")
+    ]
+
+
+@dataclass
+class MedicineTrackerData:
+    """Runtime data for a config entry."""
+
+    medicines: dict[str, Medicine] = field(default_factory=dict)
+    rules: RuleIndex = field(default_factory=lambda: RuleIndex({}))
+    rule_action: str = RULE_ACTION_BLOCK
+    # Medicine sensors by medicine id, filled in by the sensor platform
+    sensors: dict[str, Any] = field(default_factory=dict)
+    setup_duration: float | None = None
+    log: DoseLog | None = None
+    # Shared by the local-time medicines, if a timezone sensor is set
+    zone: ZoneTracker | None = None
+    # The schedule source file, if one is set
+    source: SourceSnapshot | None = None
+
+    def history_of(self, med_id: str) -> list:
+        """Return the sorted dose history of a medicine."""
+        sensor = self.sensors.get(med_id)
+        return sensor.history if sensor is not None else []
+
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Medicine Tracker services."""
@@ -44,20 +186,173 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
                     if hasattr(entity, "reset_history"):
                         await entity.reset_history()
 
+    # 3. Log Doses Service (batched, possibly late or out of order)
+    async def handle_log_doses(call: ServiceCall):
+        grouped = group_events([
+            (event["entity_id"], event[ATTR_TIME_TAKEN])
+            for event in call.data[ATTR_EVENTS]
+        ], dt_util.DEFAULT_TIME_ZONE)
+
+        platforms = async_get_platforms(hass, DOMAIN)
+        for platform in platforms:
+            for entity in platform.entities.values():
+                if entity.entity_id in grouped:
+                    if hasattr(entity, "add_doses"):
+                        await entity.add_doses(grouped[entity.entity_id])
+
+    # 4. Bulk Services: one validated update (and reload) per entry
+    async def handle_import_regimen(call: ServiceCall):
+        entry = _get_entry(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+        imported = parse_regimen(call.data[ATTR_REGIMEN])
+        async_apply(
+            hass,
+            entry,
+            add_medicines(entry_medicines(entry), imported, call.data[ATTR_REPLACE]),
+        )
+
+    async def handle_clone_medicines(call: ServiceCall):
+        target = _get_entry(hass, call.data[ATTR_TARGET_ENTRY_ID])
+        clones = []
+        source_ids = []
+        for entry_id, med_ids in _medicines_by_entry(hass, call.data["entity_id"]).items():
+            medicines = entry_medicines(_get_entry(hass, entry_id))
+            for med_id in med_ids:
+                if med_id in medicines:
+                    clones.append(Medicine.from_dict(medicines[med_id]))
+                    source_ids.append(med_id)
+        async_apply(
+            hass,
+            target,
+            add_medicines(entry_medicines(target), clones, source_ids=source_ids),
+        )
+
+    async def handle_shift_times(call: ServiceCall):
+        updates = []
+        for entry_id, med_ids in _medicines_by_entry(hass, call.data["entity_id"]).items():
+            entry = _get_entry(hass, entry_id)
+            updates.append(
+                (entry, shift_times(entry_medicines(entry), call.data[ATTR_MINUTES], med_ids))
+            )
+        # Every entry validated before any is written
+        for entry, medicines in updates:
+            async_apply(hass, entry, medicines)
+
+    # 5. Snooze / Skip: per-sensor overrides of the next occurrence, no reload
+    async def handle_snooze_medicine(call: ServiceCall):
+        for entity in _sensors(hass, call.data["entity_id"]):
+            await entity.snooze(call.data[ATTR_DURATION])
+
+    async def handle_skip_dose(call: ServiceCall):
+        for entity in _sensors(hass, call.data["entity_id"]):
+            await entity.skip()
+
+    # 6. Read Log: incremental export of the append-only dose log
+    async def handle_read_log(call: ServiceCall) -> ServiceResponse:
+        entry = _get_entry(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+        if getattr(entry, "runtime_data", None) is None or entry.runtime_data.log is None:
+            raise ServiceValidationError(f"{entry.title} is not loaded")
+        return await entry.runtime_data.log.async_read(
+            call.data[ATTR_CURSOR], call.data[ATTR_LIMIT]
+        )
+
     hass.services.async_register(DOMAIN, SERVICE_TAKE, handle_take_medicine)
     hass.services.async_register(DOMAIN, SERVICE_RESET, handle_reset_history)
+    hass.services.async_register(
+        DOMAIN, SERVICE_LOG_DOSES, handle_log_doses, schema=LOG_DOSES_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_IMPORT_REGIMEN, handle_import_regimen, schema=IMPORT_REGIMEN_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_CLONE_MEDICINES, handle_clone_medicines, schema=CLONE_MEDICINES_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SHIFT_TIMES, handle_shift_times, schema=SHIFT_TIMES_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SNOOZE, handle_snooze_medicine, schema=SNOOZE_SCHEMA
+    )
+    hass.services.async_register(DOMAIN, SERVICE_SKIP, handle_skip_dose, schema=SKIP_SCHEMA)
+    hass.services.async_register(
+        DOMAIN, SERVICE_READ_LOG, handle_read_log,
+        schema=READ_LOG_SCHEMA, supports_response=SupportsResponse.ONLY,
+    )
     
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Medicine Tracker from a config entry."""
+    medicines_dict = entry.options.get(CONF_MEDICINES)
+    if medicines_dict is None:
+        medicines_dict = entry.data.get(CONF_MEDICINES, {})
+
+    medicines = {
+        med_id: Medicine.from_dict(med_data)
+        for med_id, med_data in medicines_dict.items()
+    }
+
+    source = None
+    if entry.options.get(CONF_SCHEDULE_SOURCE):
+        source = await async_load_source(hass, entry.options[CONF_SCHEDULE_SOURCE])
+        if source.error:
+            _LOGGER.error("Cannot read schedule source %s: %s", source.path, source.error)
+        medicines.update(source.medicines)
+        entry.async_on_unload(async_track_source(hass, entry, source))
+
+    entry.runtime_data = data = MedicineTrackerData(
+        medicines=medicines,
+        rules=RuleIndex(medicines),
+        rule_action=entry.options.get(CONF_RULE_ACTION, RULE_ACTION_BLOCK),
+        log=DoseLog(hass, entry.entry_id),
+        source=source,
+    )
+
+    tz_sensor = entry.options.get(CONF_TZ_SENSOR, entry.data.get(CONF_TZ_SENSOR))
+    if tz_sensor:
+        data.zone = ZoneTracker(hass, entry.entry_id, tz_sensor)
+        await data.zone.async_start()
+        entry.async_on_unload(data.zone.async_stop)
+
+    started = time.perf_counter()
     await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+    data.setup_duration = time.perf_counter() - started
+
     entry.async_on_unload(entry.add_update_listener(update_listener))
     return True
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate an old config entry to the current schema version."""
+    if entry.version > SCHEMA_VERSION:
+        # Downgraded from a future version
+        return False
+
+    if entry.version < SCHEMA_VERSION:
+        _LOGGER.debug("Migrating %s from version %s", entry.title, entry.version)
+        data = {**entry.data}
+        options = {**entry.options}
+        for container in (data, options):
+            if CONF_MEDICINES in container:
+                container[CONF_MEDICINES] = migrate_medicines(container[CONF_MEDICINES])
+
+        hass.config_entries.async_update_entry(
+            entry, data=data, options=options, version=SCHEMA_VERSION
+        )
+
+    return True
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, ["sensor"])
+    unloaded = await hass.config_entries.async_unload_platforms(entry, ["sensor"])
+    if unloaded:
+        await entry.runtime_data.log.async_close()
+    return unloaded
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the dose log and stored zone of a removed entry."""
+    path = log_path(hass.config.config_dir, entry.entry_id)
+    if await hass.async_add_executor_job(os.path.exists, path):
+        await hass.async_add_executor_job(os.remove, path)
+    await zone_store(hass, entry.entry_id).async_remove()
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload the integration when options are updated."""
@@ -16,6 +16,13 @@ from homeassistant.helpers.selector import (
     SelectSelectorMode,
     SelectOptionDict,
     TimeSelector,
+    TextSelector,
+    TextSelectorConfig,
+    BooleanSelector,
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
+    DateSelector,
     IconSelector,
     EntitySelector,
     EntitySelectorConfig,
@@ -26,8 +33,20 @@ from .const import (
     CONF_PATIENT, CONF_SCHEDULE_DAYS, CONF_SCHEDULE_TIME,
     CONF_TIME_MODE, CONF_TZ_SENSOR,
     MODE_HOME_TIME, MODE_LOCAL_TIME,
-    CONF_MEDICINES, CONF_MEDICINE_ID
+    CONF_MEDICINES, CONF_MEDICINE_ID,
+    CONF_MEDICINE_IDS, CONF_REGIMEN, CONF_REPLACE,
+    CONF_TARGET_ENTRY, CONF_SHIFT_MINUTES,
+    CONF_MIN_INTERVAL, CONF_MAX_DAILY, CONF_SEPARATE_FROM, CONF_SEPARATION,
+    CONF_RULE_ACTION, RULE_ACTION_BLOCK, RULE_ACTION_WARN,
+    CONF_START_DATE, CONF_END_DATE, CONF_COURSE_DOSES, CONF_SCHEDULE_SOURCE
 )
+from .ingest import HISTORY_SIZE
+from .models import SCHEMA_VERSION, Medicine, migrate_medicines
+from .regimen import (
+    RegimenError, add_medicines, async_apply, entry_medicines,
+    parse_regimen, remove_medicines, shift_times
+)
+from .sources import async_load_source
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -46,8 +65,24 @@ DAY_OPTIONS = [
     SelectOptionDict(value="sun", label="Sunday"),
 ]
 
-def get_medicine_schema(defaults=None):
-    """Build the schema for a single medicine (Simplified)."""
+RULE_ACTION_OPTIONS = [
+    SelectOptionDict(value=RULE_ACTION_BLOCK, label="Reject the dose"),
+    SelectOptionDict(value=RULE_ACTION_WARN, label="Log the dose and fire an event"),
+]
+
+def _minutes_selector(maximum):
+    return NumberSelector(
+        NumberSelectorConfig(
+            min=0, max=maximum, step=5,
+            unit_of_measurement="min", mode=NumberSelectorMode.BOX
+        )
+    )
+
+def get_medicine_schema(defaults=None, others=None):
+    """Build the schema for a single medicine (Simplified).
+
+    `others` lists the patient's other medicines this one can be kept apart from.
+    """
     if defaults is None:
         defaults = {}
 
@@ -68,14 +103,42 @@ def get_medicine_schema(defaults=None):
         vol.Required(CONF_TIME_MODE, default=defaults.get(CONF_TIME_MODE, MODE_HOME_TIME)): SelectSelector(
             SelectSelectorConfig(options=TIME_MODE_OPTIONS, mode=SelectSelectorMode.DROPDOWN)
         ),
+
+        # Dose rules (0 = no rule); a daily maximum is checked against the
+        # sensor's history, so it cannot exceed the history size
+        vol.Optional(CONF_MIN_INTERVAL, default=defaults.get(CONF_MIN_INTERVAL, 0)): _minutes_selector(2880),
+        vol.Optional(CONF_MAX_DAILY, default=defaults.get(CONF_MAX_DAILY, 0)): NumberSelector(
+            NumberSelectorConfig(min=0, max=HISTORY_SIZE, step=1, mode=NumberSelectorMode.BOX)
+        ),
+
+        # Course (empty / 0 = open-ended)
+        vol.Optional(
+            CONF_START_DATE, description={"suggested_value": defaults.get(CONF_START_DATE)}
+        ): DateSelector(),
+        vol.Optional(
+            CONF_END_DATE, description={"suggested_value": defaults.get(CONF_END_DATE)}
+        ): DateSelector(),
+        vol.Optional(CONF_COURSE_DOSES, default=defaults.get(CONF_COURSE_DOSES, 0)): NumberSelector(
+            NumberSelectorConfig(min=0, max=1000, step=1, mode=NumberSelectorMode.BOX)
+        ),
     }
+    if others:
+        # Only medicines still offered can be selected
+        offered = {option["value"] for option in others}
+        separate_from = [
+            other for other in defaults.get(CONF_SEPARATE_FROM) or [] if other in offered
+        ]
+        schema[vol.Optional(CONF_SEPARATE_FROM, default=separate_from)] = SelectSelector(
+            SelectSelectorConfig(options=others, multiple=True)
+        )
+        schema[vol.Optional(CONF_SEPARATION, default=defaults.get(CONF_SEPARATION, 0))] = _minutes_selector(1440)
     return vol.Schema(schema)
 
 
 class MedicineTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Medicine Tracker."""
 
-    VERSION = 1
+    VERSION = SCHEMA_VERSION
 
     @staticmethod
     @callback
@@ -123,49 +186,87 @@ class MedicineTrackerOptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         # self.config_entry is now a read-only property in HA, so we do not set it manually.
         # We use the 'config_entry' argument passed to this function to initialize our data.
-        self.medicines = {**config_entry.options.get(CONF_MEDICINES, config_entry.data.get(CONF_MEDICINES, {}))}
+        self.medicines = migrate_medicines(
+            config_entry.options.get(CONF_MEDICINES, config_entry.data.get(CONF_MEDICINES, {}))
+        )
         self._editing_id = None
 
     async def async_step_init(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Menu: Add/Edit/Remove/Settings."""
         return self.async_show_menu(
             step_id="init",
-            menu_options=["add_medicine", "edit_medicine", "remove_medicine", "global_settings"]
+            menu_options=[
+                "add_medicine", "edit_medicine", "remove_medicine",
+                "import_regimen", "clone_medicine", "shift_times",
+                "global_settings"
+            ]
         )
     
     # --- SETTINGS ---
     async def async_step_global_settings(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Update global settings like Timezone Sensor."""
+        errors = {}
+        placeholders = {"error": ""}
+
         if user_input is not None:
-            return self.async_create_entry(
-                title="",
-                data={
-                    CONF_MEDICINES: self.medicines,
-                    CONF_TZ_SENSOR: user_input.get(CONF_TZ_SENSOR)
-                }
-            )
+            source = (user_input.get(CONF_SCHEDULE_SOURCE) or "").strip() or None
+            if source:
+                snapshot = await async_load_source(self.hass, source)
+                if snapshot.error:
+                    errors[CONF_SCHEDULE_SOURCE] = "invalid_source"
+                    placeholders["error"] = snapshot.error
+            if not errors:
+                return self.async_create_entry(
+                    title="",
+                    data={
+                        **self.config_entry.options,
+                        CONF_MEDICINES: self.medicines,
+                        CONF_TZ_SENSOR: user_input.get(CONF_TZ_SENSOR),
+                        CONF_RULE_ACTION: user_input.get(CONF_RULE_ACTION, RULE_ACTION_BLOCK),
+                        CONF_SCHEDULE_SOURCE: source,
+                    }
+                )
 
         current_tz = self.config_entry.options.get(CONF_TZ_SENSOR, self.config_entry.data.get(CONF_TZ_SENSOR))
+        current_action = self.config_entry.options.get(CONF_RULE_ACTION, RULE_ACTION_BLOCK)
+        current_source = self.config_entry.options.get(CONF_SCHEDULE_SOURCE)
         
         schema = vol.Schema({
             vol.Optional(CONF_TZ_SENSOR, default=current_tz): EntitySelector(
                 EntitySelectorConfig(domain="sensor")
-            )
+            ),
+            vol.Required(CONF_RULE_ACTION, default=current_action): SelectSelector(
+                SelectSelectorConfig(options=RULE_ACTION_OPTIONS, mode=SelectSelectorMode.DROPDOWN)
+            ),
+            vol.Optional(
+                CONF_SCHEDULE_SOURCE, description={"suggested_value": current_source}
+            ): TextSelector(),
         })
         
-        return self.async_show_form(step_id="global_settings", data_schema=schema)
+        return self.async_show_form(
+            step_id="global_settings",
+            data_schema=schema,
+            errors=errors,
+            description_placeholders=placeholders,
+        )
 
     # --- ADD ---
     async def async_step_add_medicine(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Form to add a new medicine."""
+        errors = {}
         if user_input is not None:
-            new_id = str(uuid.uuid4())
-            self.medicines[new_id] = user_input
-            return await self._update_entry()
+            medicine = Medicine.from_dict(user_input)
+            if medicine.course_is_valid:
+                self.medicines[str(uuid.uuid4())] = medicine.as_dict()
+                return await self._update_entry()
+            errors["base"] = "invalid_course"
 
         return self.async_show_form(
             step_id="add_medicine", 
-            data_schema=get_medicine_schema()
+            data_schema=get_medicine_schema(
+                defaults=user_input, others=self._medicine_options()
+            ),
+            errors=errors,
         )
 
     # --- EDIT ---
@@ -189,14 +290,25 @@ class MedicineTrackerOptionsFlowHandler(config_entries.OptionsFlow):
         return self.async_show_form(step_id="edit_medicine", data_schema=schema)
 
     async def async_step_edit_medicine_details(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        errors = {}
         if user_input is not None:
-            self.medicines[self._editing_id] = user_input
-            return await self._update_entry()
+            medicine = Medicine.from_dict(user_input)
+            if medicine.course_is_valid:
+                self.medicines[self._editing_id] = medicine.as_dict()
+                return await self._update_entry()
+            errors["base"] = "invalid_course"
 
-        existing_data = self.medicines[self._editing_id]
+        existing = Medicine.from_dict(self.medicines[self._editing_id])
         return self.async_show_form(
             step_id="edit_medicine_details", 
-            data_schema=get_medicine_schema(defaults=existing_data)
+            data_schema=get_medicine_schema(
+                defaults=user_input or existing.to_form(),
+                others=[
+                    option for option in self._medicine_options()
+                    if option["value"] != self._editing_id
+                ],
+            ),
+            errors=errors,
         )
 
     # --- REMOVE ---
@@ -205,9 +317,7 @@ class MedicineTrackerOptionsFlowHandler(config_entries.OptionsFlow):
              return self.async_abort(reason="no_medicines")
              
         if user_input is not None:
-            mid = user_input[CONF_MEDICINE_ID]
-            if mid in self.medicines:
-                del self.medicines[mid]
+            self.medicines = remove_medicines(self.medicines, [user_input[CONF_MEDICINE_ID]])
             return await self._update_entry()
 
         options = [
@@ -221,6 +331,103 @@ class MedicineTrackerOptionsFlowHandler(config_entries.OptionsFlow):
         })
         return self.async_show_form(step_id="remove_medicine", data_schema=schema)
 
+    # --- BULK ---
+    def _medicine_options(self):
+        return [
+            SelectOptionDict(value=mid, label=data[CONF_NAME])
+            for mid, data in self.medicines.items()
+        ]
+
+    async def async_step_import_regimen(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Import several medicines from YAML/JSON in one update."""
+        errors = {}
+        placeholders = {"error": ""}
+
+        if user_input is not None:
+            try:
+                imported = parse_regimen(user_input[CONF_REGIMEN])
+            except RegimenError as err:
+                errors["base"] = "invalid_regimen"
+                placeholders["error"] = str(err)
+            else:
+                self.medicines = add_medicines(
+                    self.medicines, imported, user_input.get(CONF_REPLACE, False)
+                )
+                return await self._update_entry()
+
+        schema = vol.Schema({
+            vol.Required(CONF_REGIMEN): TextSelector(TextSelectorConfig(multiline=True)),
+            vol.Optional(CONF_REPLACE, default=False): BooleanSelector(),
+        })
+        return self.async_show_form(
+            step_id="import_regimen",
+            data_schema=schema,
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+    async def async_step_clone_medicine(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Copy medicines to another patient's entry in one update."""
+        if not self.medicines:
+             return self.async_abort(reason="no_medicines")
+
+        targets = [
+            entry for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if entry.entry_id != self.config_entry.entry_id
+        ]
+        if not targets:
+            return self.async_abort(reason="no_other_patients")
+
+        if user_input is not None:
+            target = self.hass.config_entries.async_get_entry(user_input[CONF_TARGET_ENTRY])
+            med_ids = user_input[CONF_MEDICINE_IDS]
+            clones = [Medicine.from_dict(self.medicines[mid]) for mid in med_ids]
+            async_apply(
+                self.hass,
+                target,
+                add_medicines(entry_medicines(target), clones, source_ids=med_ids),
+            )
+            return await self._update_entry()
+
+        schema = vol.Schema({
+            vol.Required(CONF_MEDICINE_IDS): SelectSelector(
+                SelectSelectorConfig(options=self._medicine_options(), multiple=True)
+            ),
+            vol.Required(CONF_TARGET_ENTRY): SelectSelector(
+                SelectSelectorConfig(options=[
+                    SelectOptionDict(value=entry.entry_id, label=entry.title)
+                    for entry in targets
+                ])
+            ),
+        })
+        return self.async_show_form(step_id="clone_medicine", data_schema=schema)
+
+    async def async_step_shift_times(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Shift the time of several (default all) medicines in one update."""
+        if not self.medicines:
+             return self.async_abort(reason="no_medicines")
+
+        if user_input is not None:
+            self.medicines = shift_times(
+                self.medicines,
+                int(user_input[CONF_SHIFT_MINUTES]),
+                user_input.get(CONF_MEDICINE_IDS) or None,
+            )
+            return await self._update_entry()
+
+        schema = vol.Schema({
+            vol.Required(CONF_SHIFT_MINUTES, default=0): NumberSelector(
+                NumberSelectorConfig(
+                    min=-720, max=720, step=5,
+                    unit_of_measurement="min", mode=NumberSelectorMode.BOX
+                )
+            ),
+            vol.Optional(CONF_MEDICINE_IDS): SelectSelector(
+                SelectSelectorConfig(options=self._medicine_options(), multiple=True)
+            ),
+        })
+        return self.async_show_form(step_id="shift_times", data_schema=schema)
+
     async def _update_entry(self):
         """Write changes back."""
         current_tz = self.config_entry.options.get(CONF_TZ_SENSOR, self.config_entry.data.get(CONF_TZ_SENSOR))
@@ -228,6 +435,7 @@ class MedicineTrackerOptionsFlowHandler(config_entries.OptionsFlow):
         return self.async_create_entry(
             title="",
             data={
+                **self.config_entry.options,
                 CONF_MEDICINES: self.medicines,
                 CONF_TZ_SENSOR: current_tz
             }
@@ -6,6 +6,7 @@ DOMAIN = "medicine_tracker"
 CONF_MEDICINES = "medicines" 
 CONF_PATIENT = "patient"
 CONF_TZ_SENSOR = "tz_sensor" # Global Timezone Sensor for the User
+CONF_SCHEDULE_SOURCE = "schedule_source"  # iCalendar or prescription file
 
 # Medicine Properties (Item Level)
 CONF_MEDICINE_ID = "med_id"
@@ -16,6 +17,33 @@ CONF_SCHEDULE_DAYS = "days"
 CONF_SCHEDULE_TIME = "time"
 CONF_TIME_MODE = "time_mode"
 
+# Dose Rules (Item Level)
+CONF_MIN_INTERVAL = "min_interval"  # Minutes between doses of this medicine
+CONF_MAX_DAILY = "max_daily"  # Doses per local day
+CONF_SEPARATE_FROM = "separate_from"  # Medicine ids to keep apart from
+CONF_SEPARATION = "separation"  # Minutes to keep apart
+
+# Course (Item Level)
+CONF_START_DATE = "start_date"  # First day of the course
+CONF_END_DATE = "end_date"  # Last day of the course
+CONF_COURSE_DOSES = "course_doses"  # Doses that complete the course
+
+# Dose Rules (Entry Level)
+CONF_RULE_ACTION = "rule_action"
+RULE_ACTION_BLOCK = "block"
+RULE_ACTION_WARN = "warn"
+
+# Bulk Operations
+CONF_MEDICINE_IDS = "med_ids"
+CONF_REGIMEN = "regimen"
+CONF_REPLACE = "replace"
+CONF_TARGET_ENTRY = "target_entry"
+CONF_SHIFT_MINUTES = "minutes"
+
+# Events
+EVENT_DOSE_MISSED = f"{DOMAIN}_dose_missed"
+EVENT_RULE_VIOLATION = f"{DOMAIN}_rule_violation"
+
 # Modes
 MODE_HOME_TIME = "home_time"
 MODE_LOCAL_TIME = "local_time"
\ No newline at end of file
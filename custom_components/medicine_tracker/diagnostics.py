@@ -0,0 +1,136 @@
+"""Diagnostics support for Medicine Tracker.
+
+A per-entry snapshot of what the sensors computed and how fast: each
+medicine's compiled schedule, effective timezone, due times and deadline,
+history size and recent update timings, plus the hit rates of the shared
+caches. Names, dosages and anything else identifying the patient are
+redacted, and medicines are keyed by position rather than by id, since ids
+can be derived from names.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from . import sources, tztable
+from .const import (
+    CONF_DOSAGE, CONF_MEDICINES, CONF_NAME, CONF_PATIENT, CONF_SCHEDULE_SOURCE,
+    CONF_SEPARATE_FROM, CONF_TZ_SENSOR,
+)
+from .labels import get_formatter
+
+TO_REDACT = {
+    CONF_PATIENT,
+    CONF_TZ_SENSOR,
+    CONF_SCHEDULE_SOURCE,
+    CONF_NAME,
+    CONF_DOSAGE,
+    "entity_id",
+    "path",
+    "error",
+}
+
+
+def _cache(info: dict[str, int]) -> dict[str, Any]:
+    """Add the hit rate to a cache's counters."""
+    lookups = info["hits"] + info["misses"]
+    return {**info, "hit_rate": round(info["hits"] / lookups, 3) if lookups else None}
+
+
+def _timings(values: list[float]) -> dict[str, Any]:
+    """Summarize update durations in milliseconds."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "max": max(values),
+    }
+
+
+class _MedicineKeys(dict):
+    """Opaque medicine keys, "medicine_1" onwards, assigned on first use."""
+
+    def __missing__(self, med_id: str) -> str:
+        key = self[med_id] = f"medicine_{len(self) + 1}"
+        return key
+
+
+def _config(config: dict[str, Any], keys: _MedicineKeys) -> dict[str, Any]:
+    """Return entry data or options with stored medicines keyed opaquely."""
+    config = dict(config)
+    if CONF_MEDICINES in config:
+        medicines = {}
+        for med_id, medicine in config[CONF_MEDICINES].items():
+            medicine = dict(medicine)
+            if medicine.get(CONF_SEPARATE_FROM):
+                medicine[CONF_SEPARATE_FROM] = [
+                    keys[other] for other in medicine[CONF_SEPARATE_FROM]
+                ]
+            medicines[keys[med_id]] = medicine
+        config[CONF_MEDICINES] = medicines
+    return config
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data = entry.runtime_data
+    keys = _MedicineKeys(
+        (med_id, f"medicine_{index}") for index, med_id in enumerate(data.medicines, 1)
+    )
+    medicines = {
+        keys[med_id]: sensor.diagnostics() for med_id, sensor in data.sensors.items()
+    }
+
+    zone = None
+    if data.zone is not None:
+        zone = {
+            "entity_id": data.zone.entity_id,
+            "zone": data.zone.zone_name,
+            "changes": data.zone.changes,
+        }
+    source = None
+    if data.source is not None:
+        source = {
+            "path": data.source.path,
+            "mtime": data.source.mtime,
+            "error": data.source.error,
+            "medicines": len(data.source.medicines),
+        }
+
+    return async_redact_data(
+        {
+            "entry": {
+                "version": entry.version,
+                "data": _config(entry.data, keys),
+                "options": _config(entry.options, keys),
+            },
+            "setup_duration_ms": (
+                round(data.setup_duration * 1000, 2)
+                if data.setup_duration is not None
+                else None
+            ),
+            "home_timezone": str(dt_util.DEFAULT_TIME_ZONE),
+            "zone": zone,
+            "source": source,
+            "rule_action": data.rule_action,
+            "rules": len(data.rules),
+            "log_pending": data.log.pending if data.log is not None else 0,
+            "caches": {
+                "timezone_tables": _cache(tztable.cache_info()),
+                "labels": _cache(get_formatter(hass.config.language).cache_info()),
+                "sources": _cache(sources.cache_info()),
+            },
+            "update_ms": _timings(
+                [value for medicine in medicines.values() for value in medicine["update_ms"]]
+            ),
+            "medicines": medicines,
+        },
+        TO_REDACT,
+    )
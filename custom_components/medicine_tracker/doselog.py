@@ -0,0 +1,193 @@
+"""Append-only dose log for Medicine Tracker.
+
+Every dose event of a config entry (taken, missed, skipped, snoozed,
+history reset, course completed) is appended as one JSON object per line to
+``<config>/medicine_tracker/<entry_id>.jsonl``. Records are buffered and
+written in batches from the executor. Readers sync incrementally: a cursor
+is the byte offset just past the last record they have read, so each pull
+seeks straight to the new records.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+import json
+import logging
+import os
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Record kinds
+RECORD_TAKEN = "taken"
+RECORD_MISSED = "missed"
+RECORD_SKIPPED = "skipped"
+RECORD_SNOOZED = "snoozed"
+RECORD_RESET = "reset"
+RECORD_COMPLETED = "completed"
+
+FLUSH_DELAY = 5  # Seconds records may wait in the buffer
+MAX_PENDING = 500  # Records that force an early flush
+MAX_READ = 5000  # Records returned by one read
+
+
+def log_path(config_dir: str, entry_id: str) -> str:
+    """Return the log file of a config entry."""
+    return os.path.join(config_dir, DOMAIN, f"{entry_id}.jsonl")
+
+
+def append_lines(path: str, lines: list[str]) -> None:
+    """Append encoded records to `path` with a single write."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("".join(lines))
+
+
+def read_records(path: str, cursor: int, limit: int) -> tuple[list[dict[str, Any]], int, bool]:
+    """Read up to `limit` records from byte offset `cursor`.
+
+    Return the records, the cursor to resume from and whether the end of the
+    log was reached. A record still being written (no newline yet) is left
+    for the next read; a corrupt one is logged and skipped.
+    """
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        if cursor:
+            raise ServiceValidationError(f"Invalid cursor: {cursor}") from None
+        return [], 0, True
+
+    with file:
+        size = file.seek(0, os.SEEK_END)
+        if cursor > size:
+            raise ServiceValidationError(f"Invalid cursor: {cursor}")
+        if cursor:
+            # A cursor always follows a newline
+            file.seek(cursor - 1)
+            if file.read(1) != b"\n":
+                raise ServiceValidationError(f"Invalid cursor: {cursor}")
+
+        file.seek(cursor)
+        records = []
+        while len(records) < limit:
+            line = file.readline()
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                _LOGGER.warning("Skipping corrupt record at offset %s of %s", cursor, path)
+            cursor += len(line)
+        return records, cursor, cursor >= size
+
+
+class DoseLog:
+    """Buffered writer and reader of one entry's dose log."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the log of `entry_id`."""
+        self.hass = hass
+        self.path = log_path(hass.config.config_dir, entry_id)
+        self._pending: list[str] = []
+        self._lock = asyncio.Lock()
+        self._cancel_flush: Callable[[], None] | None = None
+        self._unsub_final_write = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_final_write
+        )
+
+    @property
+    def pending(self) -> int:
+        """Return the number of records waiting to be written."""
+        return len(self._pending)
+
+    @callback
+    def append(
+        self,
+        kind: str,
+        med_id: str | None,
+        name: str | None,
+        when: datetime | None = None,
+        **extra: Any,
+    ) -> None:
+        """Queue one record; it is written with the next batch."""
+        record = {
+            "event": kind,
+            "med_id": med_id,
+            "medicine": name,
+            "time": when.isoformat() if when else None,
+            "recorded": dt_util.utcnow().isoformat(),
+            **extra,
+        }
+        self._pending.append(json.dumps(record, separators=(",", ":")) + "\n")
+
+        if len(self._pending) >= MAX_PENDING:
+            self._cancel_timer()
+            self.hass.async_create_task(self.async_flush())
+        elif self._cancel_flush is None:
+            self._cancel_flush = async_call_later(
+                self.hass, FLUSH_DELAY, self._async_flush_later
+            )
+
+    async def _async_flush_later(self, _now) -> None:
+        """Flush timer callback."""
+        self._cancel_flush = None
+        await self.async_flush()
+
+    @callback
+    def _cancel_timer(self) -> None:
+        """Cancel the pending flush timer, if any."""
+        if self._cancel_flush:
+            self._cancel_flush()
+            self._cancel_flush = None
+
+    async def async_flush(self) -> None:
+        """Write every queued record, in order.
+
+        If the write fails the records go back to the front of the buffer
+        and another flush is scheduled.
+        """
+        async with self._lock:
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+            try:
+                await self.hass.async_add_executor_job(append_lines, self.path, lines)
+            except OSError as err:
+                _LOGGER.error("Error writing dose log %s: %s", self.path, err)
+                self._pending[:0] = lines
+                if self._cancel_flush is None:
+                    self._cancel_flush = async_call_later(
+                        self.hass, FLUSH_DELAY, self._async_flush_later
+                    )
+
+    async def async_read(self, cursor: int, limit: int) -> dict[str, Any]:
+        """Flush, then read up to `limit` records from `cursor`."""
+        await self.async_flush()
+        records, cursor, end = await self.hass.async_add_executor_job(
+            read_records, self.path, cursor, min(limit, MAX_READ)
+        )
+        return {"records": records, "cursor": cursor, "end": end}
+
+    async def _async_final_write(self, _event: Event) -> None:
+        """Flush before Home Assistant stops."""
+        self._unsub_final_write = None
+        await self.async_close()
+
+    async def async_close(self) -> None:
+        """Stop the timer and write what is left."""
+        self._cancel_timer()
+        if self._unsub_final_write:
+            self._unsub_final_write()
+            self._unsub_final_write = None
+        await self.async_flush()
+        # No retries once closed; a failed write has been logged
+        self._cancel_timer()
@@ -0,0 +1,219 @@
+"""Minimal iCalendar reader for medicine schedules.
+
+Only the part of RFC 5545 a calendar export of a regimen needs is read. Each
+VEVENT becomes one Medicine:
+
+    SUMMARY      -- the medicine name
+    DESCRIPTION  -- the dosage (first line)
+    DTSTART      -- the dose time, and the first day of the course
+    RRULE        -- FREQ=DAILY or FREQ=WEEKLY, optionally with BYDAY, UNTIL
+                    (last day of the course) and COUNT (doses in the course)
+
+An event without an RRULE is a single dose. Floating times (no zone) follow
+the patient's local time; UTC and zoned (TZID) times are converted to the
+home zone as of DTSTART and follow home time, moving BYDAY days along if the
+conversion crosses midnight. A recurrence this model cannot represent (other
+frequencies, intervals, exceptions) or an unknown zone is an error rather
+than being dropped.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .const import MODE_HOME_TIME, MODE_LOCAL_TIME
+from .models import DEFAULT_TIME, Medicine
+from .schedule import ALL_DAYS, rotate_days
+
+# RFC 5545 weekday codes, Monday first like the weekday bitmask
+ICAL_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+_UNSUPPORTED = ("RDATE", "EXDATE", "RECURRENCE-ID")
+
+
+class CalendarError(ValueError):
+    """A calendar cannot be turned into medicines."""
+
+
+def unfold(text: str) -> list[str]:
+    """Split `text` into content lines, joining folded continuations."""
+    lines: list[str] = []
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def parse_line(line: str) -> tuple[str, dict[str, str], str]:
+    """Split a content line into its name, parameters and value."""
+    quoted = False
+    for index, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            break
+    else:
+        raise CalendarError(f"Invalid line: {line}")
+
+    name, *params = line[:index].split(";")
+    parameters = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        parameters[key.upper()] = value.strip('"')
+    return name.upper(), parameters, line[index + 1:]
+
+
+def _unescape(value: str) -> str:
+    """Undo TEXT escaping."""
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            char = "\n" if char in ("n", "N") else char
+        result.append(char)
+    return "".join(result)
+
+
+def _parse_datetime(
+    value: str, params: dict[str, str], tz: tzinfo
+) -> tuple[date, int | None, bool, int]:
+    """Parse a DATE or DATE-TIME value.
+
+    UTC and zoned times are converted to `tz`. Return the date, the minutes
+    since midnight (None for a date), whether the time is floating and the
+    days the conversion moved the date by.
+    """
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime.strptime(value, "%Y%m%d").date(), None, False, 0
+        wall = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    except ValueError:
+        raise CalendarError(f"Invalid date: {value}") from None
+
+    if value.endswith("Z"):
+        zone = timezone.utc
+    elif "TZID" in params:
+        try:
+            zone = ZoneInfo(params["TZID"])
+        except (ZoneInfoNotFoundError, ValueError):
+            raise CalendarError(f"Unknown time zone: {params['TZID']}") from None
+    else:
+        return wall.date(), wall.hour * 60 + wall.minute, True, 0
+
+    parsed = wall.replace(tzinfo=zone).astimezone(tz)
+    shift = (parsed.date() - wall.date()).days
+    return parsed.date(), parsed.hour * 60 + parsed.minute, False, shift
+
+
+def _parse_rrule(value: str) -> dict[str, str]:
+    """Split an RRULE value into its parts."""
+    rule = {}
+    for part in value.split(";"):
+        key, _, item = part.partition("=")
+        rule[key.upper()] = item.upper()
+    return rule
+
+
+def _event_medicine(props: dict[str, tuple[dict[str, str], str]], tz: tzinfo) -> Medicine:
+    """Build the medicine described by one VEVENT's properties."""
+    name = _unescape(props.get("SUMMARY", ({}, ""))[1]).strip()
+    if not name:
+        raise CalendarError("Event without a SUMMARY")
+    for prop in _UNSUPPORTED:
+        if prop in props:
+            raise CalendarError(f"{name}: {prop} is not supported")
+    if "DTSTART" not in props:
+        raise CalendarError(f"{name}: no DTSTART")
+
+    start, at, floating, shift = _parse_datetime(
+        props["DTSTART"][1], props["DTSTART"][0], tz
+    )
+    dosage = None
+    if "DESCRIPTION" in props:
+        dosage = _unescape(props["DESCRIPTION"][1]).strip().split("\n")[0] or None
+
+    end = start
+    days = 1 << start.weekday()
+    doses = 1
+    if "RRULE" in props:
+        rule = _parse_rrule(props["RRULE"][1])
+        freq = rule.get("FREQ")
+        if freq not in ("DAILY", "WEEKLY"):
+            raise CalendarError(f"{name}: FREQ={freq} is not supported")
+        if rule.get("INTERVAL", "1") != "1":
+            raise CalendarError(f"{name}: INTERVAL is not supported")
+        extra = set(rule) - {"FREQ", "INTERVAL", "BYDAY", "UNTIL", "COUNT", "WKST"}
+        if extra:
+            raise CalendarError(f"{name}: {', '.join(sorted(extra))} is not supported")
+
+        days = ALL_DAYS if freq == "DAILY" else days
+        if "BYDAY" in rule:
+            try:
+                days = sum(
+                    1 << ICAL_WEEKDAYS.index(day) for day in set(rule["BYDAY"].split(","))
+                )
+            except ValueError:
+                raise CalendarError(f"{name}: invalid BYDAY {rule['BYDAY']}") from None
+            # BYDAY names days in the event's zone
+            days = rotate_days(days, shift)
+
+        end = None
+        if "UNTIL" in rule:
+            end = _parse_datetime(rule["UNTIL"], {}, tz)[0]
+        doses = 0
+        if "COUNT" in rule:
+            if not rule["COUNT"].isdigit() or not int(rule["COUNT"]):
+                raise CalendarError(f"{name}: invalid COUNT {rule['COUNT']}")
+            doses = int(rule["COUNT"])
+
+    medicine = Medicine(
+        name=name,
+        dosage=dosage,
+        time=DEFAULT_TIME if at is None else at,
+        days=days,
+        time_mode=MODE_LOCAL_TIME if floating else MODE_HOME_TIME,
+        start_date=start,
+        end_date=end,
+        course_doses=doses,
+    )
+    if not medicine.course_is_valid:
+        raise CalendarError(f"{name}: the course ends before it starts")
+    return medicine
+
+
+def parse_calendar(text: str, tz: tzinfo) -> dict[str, Medicine]:
+    """Return the medicines of a calendar, keyed by event UID.
+
+    Events without a UID are keyed by their position. Cancelled events are
+    left out.
+    """
+    medicines: dict[str, Medicine] = {}
+    props: dict[str, tuple[dict[str, str], str]] | None = None
+    count = 0
+    nested = 0  # Depth of components inside the event, like VALARM
+    for line in unfold(text):
+        name, params, value = parse_line(line)
+        if nested:
+            nested += {"BEGIN": 1, "END": -1}.get(name, 0)
+        elif name == "BEGIN" and value.upper() == "VEVENT":
+            props = {}
+        elif name == "BEGIN" and props is not None:
+            nested = 1
+        elif name == "END" and value.upper() == "VEVENT" and props is not None:
+            count += 1
+            if props.get("STATUS", ({}, ""))[1].upper() != "CANCELLED":
+                uid = props.get("UID", ({}, f"event{count}"))[1]
+                if uid in medicines:
+                    raise CalendarError(f"Duplicate UID: {uid}")
+                medicines[uid] = _event_medicine(props, tz)
+            props = None
+        elif props is not None:
+            # The first occurrence of a property wins
+            props.setdefault(name, (params, value))
+
+    if not count:
+        raise CalendarError("No events found")
+    return medicines
@@ -0,0 +1,65 @@
+"""Batch ingestion of dose events for Medicine Tracker.
+
+Mobile-originated doses can arrive late, out of order and duplicated. They
+are grouped per sensor and merged into its history in a single pass, so each
+affected sensor recomputes and writes its state once per batch.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import datetime, timedelta, tzinfo
+from heapq import merge
+
+# Doses closer together than this are the same dose logged twice
+DEDUP_WINDOW = timedelta(minutes=1)
+
+# Number of doses kept in a sensor's history
+HISTORY_SIZE = 10
+
+
+def group_events(
+    events: list[tuple[str, datetime]], tz: tzinfo
+) -> dict[str, list[datetime]]:
+    """Group (entity_id, time) events per entity, each list sorted by time.
+
+    Naive times are taken to be in `tz`, so they sort with aware ones.
+    """
+    grouped: dict[str, list[datetime]] = {}
+    for entity_id, when in events:
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=tz)
+        grouped.setdefault(entity_id, []).append(when)
+    for doses in grouped.values():
+        doses.sort()
+    return grouped
+
+
+def merge_doses(
+    history: list[datetime],
+    doses: list[datetime],
+    window: timedelta = DEDUP_WINDOW,
+    limit: int = HISTORY_SIZE,
+) -> list[datetime]:
+    """Merge sorted `doses` into sorted `history`, dropping duplicates.
+
+    A dose within `window` of a history entry, on either side, is a replay
+    of it and is dropped, so existing history entries are never rewritten.
+    Among the new doses, the earliest of a run within `window` wins. Only
+    the newest `limit` doses are returned.
+    """
+    known = [dose.timestamp() for dose in history]
+    span = window.total_seconds()
+    fresh: list[datetime] = []
+    for dose in doses:
+        ts = dose.timestamp()
+        index = bisect_left(known, ts)
+        if any(
+            abs(known[neighbour] - ts) < span
+            for neighbour in (index - 1, index)
+            if 0 <= neighbour < len(known)
+        ):
+            continue
+        if fresh and ts - fresh[-1].timestamp() < span:
+            continue
+        fresh.append(dose)
+    return list(merge(history, fresh))[-limit:]
@@ -0,0 +1,80 @@
+"""Human-readable due labels for Medicine Tracker.
+
+The sensor state is one of the ``schedule.DUE_*`` keys, translated by the
+frontend. The server-side label ("Due at 8 AM") is only a convenience
+attribute; one formatter per language builds it, and remembers every label
+it has built, so a state update normally costs a dictionary lookup.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from functools import lru_cache
+
+from .schedule import DUE_LATER, DUE_OVERDUE, DUE_TODAY, DUE_TOMORROW
+
+DEFAULT_LANGUAGE = "en"
+
+# Per-language label templates; {time} and {weekday} are filled in
+TEMPLATES = {
+    "en": {
+        DUE_OVERDUE: "Overdue",
+        DUE_TODAY: "Due at {time}",
+        DUE_TOMORROW: "Due Tomorrow",
+        DUE_LATER: "Due {weekday}",
+    },
+}
+
+WEEKDAY_NAMES = {
+    "en": (
+        "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday",
+    ),
+}
+
+
+def _time_12h(minutes: int) -> str:
+    """Format minutes since midnight as "8 AM" / "8:05 PM"."""
+    hour, minute = divmod(minutes, 60)
+    suffix = "AM" if hour < 12 else "PM"
+    hour = hour % 12 or 12
+    return f"{hour} {suffix}" if not minute else f"{hour}:{minute:02d} {suffix}"
+
+
+class LabelFormatter:
+    """Builds and memoizes due labels for one language."""
+
+    __slots__ = ("language", "hits", "misses", "_templates", "_weekdays", "_labels")
+
+    def __init__(self, language: str) -> None:
+        """Pick the templates for `language`, falling back to English."""
+        base = language.split("-")[0]
+        self.language = language if language in TEMPLATES else base
+        if self.language not in TEMPLATES:
+            self.language = DEFAULT_LANGUAGE
+        self._templates = TEMPLATES[self.language]
+        self._weekdays = WEEKDAY_NAMES[self.language]
+        self._labels: dict[tuple[str, int, int], str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def format(self, kind: str, due: datetime) -> str:
+        """Return the label for a due kind and the (local) due time."""
+        key = (kind, due.weekday(), due.hour * 60 + due.minute)
+        label = self._labels.get(key)
+        if label is None:
+            self.misses += 1
+            label = self._labels[key] = self._templates[kind].format(
+                time=_time_12h(key[2]), weekday=self._weekdays[key[1]]
+            )
+        else:
+            self.hits += 1
+        return label
+
+    def cache_info(self) -> dict[str, int]:
+        """Return the number of memoized labels and the hit counters."""
+        return {"size": len(self._labels), "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_formatter(language: str | None) -> LabelFormatter:
+    """Return the shared formatter for `language`."""
+    return LabelFormatter(language or DEFAULT_LANGUAGE)
@@ -0,0 +1,163 @@
+"""Config entry data model for Medicine Tracker.
+
+Schema version 1 stored each medicine as the raw options-flow input: the
+time as an "HH:MM:SS" string and the days as a list of day keys. Version 2
+stores typed, normalized values so loading an entry needs no parsing:
+
+    time  -- minutes since midnight (int)
+    days  -- weekday bitmask, bit 0 is Monday (int)
+
+Optional dose rules (minimum interval, daily maximum, separation from other
+medicines) and course limits (start and end dates as ISO strings, number of
+doses) are stored only when set.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, time
+from typing import Any
+
+from .const import (
+    CONF_DOSAGE, CONF_ICON, CONF_NAME, CONF_SCHEDULE_DAYS,
+    CONF_SCHEDULE_TIME, CONF_TIME_MODE, MODE_HOME_TIME,
+    CONF_MIN_INTERVAL, CONF_MAX_DAILY, CONF_SEPARATE_FROM, CONF_SEPARATION,
+    CONF_START_DATE, CONF_END_DATE, CONF_COURSE_DOSES,
+)
+from .schedule import ALL_DAYS, weekday_mask, weekday_names
+
+SCHEMA_VERSION = 2
+
+DEFAULT_TIME = 8 * 60
+
+
+def _parse_time(value: str) -> int:
+    """Parse "HH:MM[:SS]" to minutes since midnight."""
+    try:
+        hour, minute = (int(part) for part in value.split(":")[:2])
+    except (AttributeError, ValueError):
+        return DEFAULT_TIME
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return DEFAULT_TIME
+    return hour * 60 + minute
+
+
+def _parse_date(value: Any) -> date | None:
+    """Parse an ISO date; empty or invalid values mean no date."""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class Medicine:
+    """A single scheduled medicine."""
+
+    name: str
+    icon: str | None = None
+    dosage: str | None = None
+    time: int = DEFAULT_TIME
+    days: int = ALL_DAYS
+    time_mode: str = MODE_HOME_TIME
+    min_interval: int = 0
+    max_daily: int = 0
+    separate_from: tuple[str, ...] = ()
+    separation: int = 0
+    start_date: date | None = None
+    end_date: date | None = None
+    course_doses: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Medicine:
+        """Build from stored data; accepts version 1 and form input too."""
+        at = data.get(CONF_SCHEDULE_TIME, DEFAULT_TIME)
+        if not isinstance(at, int):
+            at = _parse_time(at)
+
+        days = data.get(CONF_SCHEDULE_DAYS, ALL_DAYS)
+        if not isinstance(days, int):
+            days = weekday_mask(days)
+
+        return cls(
+            name=data.get(CONF_NAME),
+            icon=data.get(CONF_ICON),
+            dosage=data.get(CONF_DOSAGE),
+            time=at,
+            days=days or ALL_DAYS,
+            time_mode=data.get(CONF_TIME_MODE) or MODE_HOME_TIME,
+            min_interval=int(data.get(CONF_MIN_INTERVAL) or 0),
+            max_daily=int(data.get(CONF_MAX_DAILY) or 0),
+            separate_from=tuple(data.get(CONF_SEPARATE_FROM) or ()),
+            separation=int(data.get(CONF_SEPARATION) or 0),
+            start_date=_parse_date(data.get(CONF_START_DATE)),
+            end_date=_parse_date(data.get(CONF_END_DATE)),
+            course_doses=int(data.get(CONF_COURSE_DOSES) or 0),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the version 2 storage layout, omitting empty fields."""
+        data = {
+            CONF_NAME: self.name,
+            CONF_ICON: self.icon,
+            CONF_DOSAGE: self.dosage,
+            CONF_SCHEDULE_TIME: self.time,
+            CONF_SCHEDULE_DAYS: self.days,
+            CONF_TIME_MODE: self.time_mode,
+        }
+        if self.min_interval:
+            data[CONF_MIN_INTERVAL] = self.min_interval
+        if self.max_daily:
+            data[CONF_MAX_DAILY] = self.max_daily
+        if self.separate_from and self.separation:
+            data[CONF_SEPARATE_FROM] = list(self.separate_from)
+            data[CONF_SEPARATION] = self.separation
+        if self.start_date:
+            data[CONF_START_DATE] = self.start_date.isoformat()
+        if self.end_date:
+            data[CONF_END_DATE] = self.end_date.isoformat()
+        if self.course_doses:
+            data[CONF_COURSE_DOSES] = self.course_doses
+        return {key: value for key, value in data.items() if value not in (None, "")}
+
+    def to_form(self) -> dict[str, Any]:
+        """Return values in the shape the options-flow form expects."""
+        return {
+            CONF_NAME: self.name,
+            CONF_ICON: self.icon or "mdi:pill",
+            CONF_DOSAGE: self.dosage or "",
+            CONF_SCHEDULE_TIME: f"{self.time // 60:02d}:{self.time % 60:02d}:00",
+            CONF_SCHEDULE_DAYS: self.day_list,
+            CONF_TIME_MODE: self.time_mode,
+            CONF_MIN_INTERVAL: self.min_interval,
+            CONF_MAX_DAILY: self.max_daily,
+            CONF_SEPARATE_FROM: list(self.separate_from),
+            CONF_SEPARATION: self.separation,
+            CONF_START_DATE: self.start_date.isoformat() if self.start_date else None,
+            CONF_END_DATE: self.end_date.isoformat() if self.end_date else None,
+            CONF_COURSE_DOSES: self.course_doses,
+        }
+
+    @property
+    def schedule_time(self) -> time:
+        """Scheduled time of day."""
+        return time(self.time // 60, self.time % 60)
+
+    @property
+    def course_is_valid(self) -> bool:
+        """Whether the course does not end before it starts."""
+        return not (self.start_date and self.end_date and self.end_date < self.start_date)
+
+    @property
+    def day_list(self) -> list[str]:
+        """Scheduled day keys, Monday first."""
+        return weekday_names(self.days)
+
+
+def migrate_medicines(medicines: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Convert a medicines mapping of any version to the current layout."""
+    return {
+        med_id: Medicine.from_dict(med_data).as_dict()
+        for med_id, med_data in medicines.items()
+    }
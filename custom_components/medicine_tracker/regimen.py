@@ -0,0 +1,215 @@
+"""Bulk medicine management for Medicine Tracker.
+
+Regimen import, cloning across patients and time shifting all produce a new
+medicines mapping that is validated as a whole and written back to the config
+entry with a single update (and therefore a single reload).
+"""
+from __future__ import annotations
+
+import dataclasses
+import uuid
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util.yaml import parse_yaml
+
+from .const import (
+    CONF_COURSE_DOSES, CONF_DOSAGE, CONF_END_DATE, CONF_ICON, CONF_MAX_DAILY,
+    CONF_MEDICINES, CONF_MIN_INTERVAL, CONF_NAME, CONF_SCHEDULE_DAYS,
+    CONF_SCHEDULE_TIME, CONF_SEPARATE_FROM, CONF_SEPARATION, CONF_START_DATE,
+    CONF_TIME_MODE, CONF_TZ_SENSOR,
+    MODE_HOME_TIME, MODE_LOCAL_TIME,
+)
+from .ingest import HISTORY_SIZE
+from .models import Medicine, migrate_medicines
+from .schedule import WEEKDAYS, rotate_days
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class RegimenError(ServiceValidationError):
+    """A regimen or bulk operation failed validation."""
+
+
+def _time_value(value: Any) -> Any:
+    """Accept "HH:MM[:SS]" strings or minutes since midnight."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return vol.Range(min=0, max=MINUTES_PER_DAY - 1)(value)
+    value = str(value)
+    parts = value.split(":")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise vol.Invalid(f"invalid time: {value}")
+    if int(parts[0]) > 23 or int(parts[1]) > 59:
+        raise vol.Invalid(f"invalid time: {value}")
+    return value
+
+
+# Day keys and full day names, case-insensitive, to day keys
+DAY_NAMES = {
+    **{day: day for day in WEEKDAYS},
+    **{
+        name: day
+        for name, day in zip(
+            ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"),
+            WEEKDAYS,
+        )
+    },
+}
+
+
+def _days_value(value: Any) -> Any:
+    """Accept a list of days, a single day or "daily".
+
+    A day is a day key ("mon") or a full day name ("Monday").
+    """
+    if value in (None, "daily"):
+        return []
+    if isinstance(value, str):
+        value = [value]
+    days = []
+    for day in value:
+        key = DAY_NAMES.get(str(day).lower())
+        if key is None:
+            raise vol.Invalid(f"invalid day: {day}")
+        days.append(key)
+    return days
+
+
+MEDICINE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): vol.All(str, vol.Length(min=1)),
+        vol.Optional(CONF_DOSAGE): vol.Any(None, vol.Coerce(str)),
+        vol.Optional(CONF_ICON): vol.Any(None, str),
+        vol.Required(CONF_SCHEDULE_TIME): _time_value,
+        vol.Optional(CONF_SCHEDULE_DAYS): _days_value,
+        vol.Optional(CONF_TIME_MODE, default=MODE_HOME_TIME): vol.In(
+            [MODE_HOME_TIME, MODE_LOCAL_TIME]
+        ),
+        vol.Optional(CONF_MIN_INTERVAL): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional(CONF_MAX_DAILY): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=HISTORY_SIZE)
+        ),
+        vol.Optional(CONF_START_DATE): cv.date,
+        vol.Optional(CONF_END_DATE): cv.date,
+        vol.Optional(CONF_COURSE_DOSES): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    }
+)
+
+
+def parse_regimen(regimen: str | list | dict) -> list[Medicine]:
+    """Parse and validate a regimen given as YAML/JSON text or data.
+
+    A regimen is a list of medicines, or a mapping with a "medicines" list.
+    """
+    if isinstance(regimen, str):
+        # YAML is a superset of JSON, so one parser covers both
+        try:
+            regimen = parse_yaml(regimen)
+        except HomeAssistantError as err:
+            raise RegimenError(f"Regimen is not valid YAML or JSON: {err}") from err
+
+    if isinstance(regimen, dict):
+        regimen = regimen.get(CONF_MEDICINES)
+    if not isinstance(regimen, list) or not regimen:
+        raise RegimenError("Regimen must be a non-empty list of medicines")
+
+    medicines = []
+    for index, item in enumerate(regimen):
+        try:
+            medicine = Medicine.from_dict(MEDICINE_SCHEMA(item))
+        except vol.Invalid as err:
+            raise RegimenError(f"Medicine {index + 1}: {err}") from err
+        if not medicine.course_is_valid:
+            raise RegimenError(f"Medicine {index + 1}: the course ends before it starts")
+        medicines.append(medicine)
+    return medicines
+
+
+def add_medicines(
+    current: dict[str, dict[str, Any]],
+    medicines: list[Medicine],
+    replace: bool = False,
+    source_ids: list[str] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Return `current` plus `medicines` under new ids.
+
+    `source_ids` are the ids the medicines had where they were copied from.
+    Separations between medicines copied together follow them to their new
+    ids; separations from anything else are dropped.
+    """
+    result = {} if replace else {**current}
+    new_ids = [str(uuid.uuid4()) for _ in medicines]
+    renamed = dict(zip(source_ids or (), new_ids))
+    for new_id, medicine in zip(new_ids, medicines):
+        separate_from = tuple(
+            renamed[other] for other in medicine.separate_from if other in renamed
+        )
+        result[new_id] = dataclasses.replace(medicine, separate_from=separate_from).as_dict()
+    return result
+
+
+def remove_medicines(
+    current: dict[str, dict[str, Any]], med_ids: list[str]
+) -> dict[str, dict[str, Any]]:
+    """Return `current` without `med_ids`, or any separation from them."""
+    result = {}
+    for med_id, data in current.items():
+        if med_id in med_ids:
+            continue
+        separate_from = [
+            other for other in data.get(CONF_SEPARATE_FROM) or () if other not in med_ids
+        ]
+        data = {**data, CONF_SEPARATE_FROM: separate_from}
+        if not separate_from:
+            data.pop(CONF_SEPARATE_FROM)
+            data.pop(CONF_SEPARATION, None)
+        result[med_id] = data
+    return result
+
+
+def shift_times(
+    current: dict[str, dict[str, Any]],
+    minutes: int,
+    med_ids: list[str] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Return `current` with medicine times shifted by `minutes`.
+
+    Doses pushed past midnight move to the neighbouring weekday, so a shifted
+    weekly schedule keeps the same interval between doses.
+    """
+    if med_ids is not None:
+        unknown = set(med_ids) - set(current)
+        if unknown:
+            raise RegimenError(f"Unknown medicines: {', '.join(sorted(unknown))}")
+
+    result = {**current}
+    for med_id in current if med_ids is None else med_ids:
+        medicine = Medicine.from_dict(current[med_id])
+        days, at = divmod(medicine.time + minutes, MINUTES_PER_DAY)
+        result[med_id] = dataclasses.replace(
+            medicine, time=at, days=rotate_days(medicine.days, days)
+        ).as_dict()
+    return result
+
+
+def entry_medicines(entry: ConfigEntry) -> dict[str, dict[str, Any]]:
+    """Return the current medicines mapping of an entry, normalized."""
+    return migrate_medicines(
+        entry.options.get(CONF_MEDICINES, entry.data.get(CONF_MEDICINES, {}))
+    )
+
+
+def async_apply(
+    hass: HomeAssistant, entry: ConfigEntry, medicines: dict[str, dict[str, Any]]
+) -> None:
+    """Write a new medicines mapping to an entry with one update."""
+    current_tz = entry.options.get(CONF_TZ_SENSOR, entry.data.get(CONF_TZ_SENSOR))
+    hass.config_entries.async_update_entry(
+        entry,
+        options={**entry.options, CONF_MEDICINES: medicines, CONF_TZ_SENSOR: current_tz},
+    )
@@ -0,0 +1,145 @@
+"""Dose rules for Medicine Tracker.
+
+Each patient's rules (minimum interval, daily maximum and pairwise spacing)
+are indexed by medicine id when the entry is set up, so validating a dose
+touches only that medicine's own rules and the histories they name, however
+large the regimen grows.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, tzinfo
+
+from .models import Medicine
+from .schedule import localize
+
+RULE_MIN_INTERVAL = "min_interval"
+RULE_MAX_DAILY = "max_daily"
+RULE_SPACING = "spacing"
+
+
+@dataclass(frozen=True, slots=True)
+class DoseRules:
+    """Rules for one medicine."""
+
+    min_interval: timedelta | None = None
+    max_daily: int | None = None
+    spacing: dict[str, timedelta] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class Violation:
+    """A dose that breaks a rule."""
+
+    rule: str
+    message: str
+    other: str | None = None
+
+
+def _nearest_gap(history: list[datetime], when: datetime) -> timedelta | None:
+    """Smallest distance between `when` and a dose in sorted `history`."""
+    index = bisect_left(history, when)
+    gaps = [
+        abs(when.timestamp() - history[neighbour].timestamp())
+        for neighbour in (index - 1, index)
+        if 0 <= neighbour < len(history)
+    ]
+    return timedelta(seconds=min(gaps)) if gaps else None
+
+
+class RuleIndex:
+    """Per-patient dose rules, indexed by medicine id."""
+
+    def __init__(self, medicines: dict[str, Medicine]) -> None:
+        """Index the rules of every medicine; spacing applies both ways."""
+        spacing: dict[str, dict[str, timedelta]] = {med_id: {} for med_id in medicines}
+        for med_id, medicine in medicines.items():
+            if not medicine.separation:
+                continue
+            gap = timedelta(minutes=medicine.separation)
+            for other in medicine.separate_from:
+                if other == med_id or other not in medicines:
+                    continue
+                spacing[med_id][other] = max(gap, spacing[med_id].get(other, gap))
+                spacing[other][med_id] = max(gap, spacing[other].get(med_id, gap))
+
+        self._names = {med_id: medicine.name for med_id, medicine in medicines.items()}
+        self._rules: dict[str, DoseRules] = {}
+        for med_id, medicine in medicines.items():
+            if medicine.min_interval or medicine.max_daily or spacing[med_id]:
+                self._rules[med_id] = DoseRules(
+                    min_interval=(
+                        timedelta(minutes=medicine.min_interval)
+                        if medicine.min_interval else None
+                    ),
+                    max_daily=medicine.max_daily or None,
+                    spacing=spacing[med_id],
+                )
+
+    def __len__(self) -> int:
+        """Number of medicines with at least one rule."""
+        return len(self._rules)
+
+    def get(self, med_id: str) -> DoseRules | None:
+        """Return the rules of a medicine, if it has any."""
+        return self._rules.get(med_id)
+
+    def check(
+        self,
+        med_id: str,
+        when: datetime,
+        history_of: Callable[[str], list[datetime]],
+        tz: tzinfo,
+    ) -> list[Violation]:
+        """Return the rules a dose of `med_id` at `when` would break.
+
+        `history_of` returns the sorted dose history of a medicine id; `tz`
+        defines the local day for the daily maximum.
+        """
+        rules = self._rules.get(med_id)
+        if rules is None:
+            return []
+
+        violations = []
+        name = self._names[med_id]
+        history = history_of(med_id)
+
+        if rules.min_interval:
+            gap = _nearest_gap(history, when)
+            if gap is not None and gap < rules.min_interval:
+                violations.append(Violation(
+                    RULE_MIN_INTERVAL,
+                    f"{name} was taken {_minutes(gap)} min from this dose; "
+                    f"the minimum interval is {_minutes(rules.min_interval)} min",
+                ))
+
+        if rules.max_daily:
+            local = when.astimezone(tz)
+            start = localize(local.date(), time(0, 0), tz)
+            end = localize(local.date() + timedelta(days=1), time(0, 0), tz)
+            taken = bisect_left(history, end) - bisect_left(history, start)
+            if taken >= rules.max_daily:
+                violations.append(Violation(
+                    RULE_MAX_DAILY,
+                    f"{name} was already taken {taken} times that day; "
+                    f"the maximum is {rules.max_daily}",
+                ))
+
+        for other, spacing in rules.spacing.items():
+            gap = _nearest_gap(history_of(other), when)
+            if gap is not None and gap < spacing:
+                violations.append(Violation(
+                    RULE_SPACING,
+                    f"{name} must be taken at least {_minutes(spacing)} min apart "
+                    f"from {self._names[other]}, which was taken {_minutes(gap)} min away",
+                    other,
+                ))
+
+        return violations
+
+
+def _minutes(delta: timedelta) -> int:
+    """Whole minutes in a timedelta."""
+    return int(delta.total_seconds() // 60)
@@ -0,0 +1,181 @@
+"""Schedule arithmetic for Medicine Tracker.
+
+Pure functions (no Home Assistant imports) so the next-due computation can be
+exercised directly by the property tests in ``tests/test_schedule.py``.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, tzinfo
+
+from . import tztable
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+ALL_DAYS = 0b1111111
+
+# Due kinds returned by classify()
+DUE_OVERDUE = "overdue"
+DUE_TODAY = "due_today"
+DUE_TOMORROW = "due_tomorrow"
+DUE_LATER = "due_later"
+
+
+def weekday_mask(days) -> int:
+    """Convert a list of day keys ("mon".."sun") to a weekday bitmask.
+
+    Bit 0 is Monday, matching ``date.weekday()``. An empty (or entirely
+    invalid) list means every day, as it always has.
+    """
+    mask = 0
+    for day in days or ():
+        if day in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(day)
+    return mask or ALL_DAYS
+
+
+def weekday_names(mask: int) -> list[str]:
+    """Convert a weekday bitmask back to day keys, Monday first."""
+    return [day for index, day in enumerate(WEEKDAYS) if mask >> index & 1]
+
+
+def rotate_days(mask: int, days: int) -> int:
+    """Rotate a weekday bitmask by `days` (positive is later in the week)."""
+    days %= 7
+    return ((mask << days) | (mask >> (7 - days))) & ALL_DAYS
+
+
+def _build_gap_table() -> tuple[tuple[int, ...], ...]:
+    """Days from each weekday to the next scheduled weekday, per mask."""
+    table = []
+    for mask in range(ALL_DAYS + 1):
+        row = []
+        for weekday in range(7):
+            gap = 7
+            for step in range(1, 8):
+                if mask >> ((weekday + step) % 7) & 1:
+                    gap = step
+                    break
+            row.append(gap)
+        table.append(tuple(row))
+    return tuple(table)
+
+
+# _NEXT_GAP[mask][weekday] -> days until the next scheduled day after `weekday`
+_NEXT_GAP = _build_gap_table()
+
+
+def localize(
+    day: date,
+    at: time,
+    tz: tzinfo,
+    nonexistent: str = tztable.NONEXISTENT_SHIFT_FORWARD,
+    ambiguous: str = tztable.AMBIGUOUS_EARLIEST,
+) -> datetime:
+    """Return the aware datetime for wall-clock `at` on `day` in `tz`.
+
+    Times skipped by a DST gap or repeated by a fold are resolved by the
+    given tztable policies.
+    """
+    return tztable.resolve(day, at, tz, nonexistent, ambiguous)
+
+
+def next_due(
+    now: datetime, at: time, mask: int, last_taken: datetime | None
+) -> datetime:
+    """Return the next scheduled dose at or after today's date.
+
+    `now` must be aware and expressed in the effective timezone. Today's dose
+    stays the answer (even once overdue) until it is taken or the day ends; if
+    it was taken, or today is not a scheduled day, the next scheduled day wins.
+    """
+    today = now.date()
+    weekday = today.weekday()
+
+    taken_today = False
+    if last_taken is not None:
+        taken_at = last_taken.timestamp()
+        table = tztable.get_table(now.tzinfo, taken_at)
+        taken_today = table.local_ordinal(taken_at) == today.toordinal()
+
+    if taken_today or not mask >> weekday & 1:
+        today = today + timedelta(days=_NEXT_GAP[mask][weekday])
+
+    return localize(today, at, now.tzinfo)
+
+
+@dataclass(frozen=True, slots=True)
+class DueOverride:
+    """A one-off change to a single scheduled occurrence.
+
+    `occurrence` is the scheduled instant it applies to; `until` is the time
+    the dose was snoozed to, or None if the dose is skipped.
+    """
+
+    occurrence: datetime
+    until: datetime | None = None
+
+
+def following_due(due: datetime, at: time, mask: int) -> datetime:
+    """Return the scheduled occurrence after `due`, in `due`'s timezone."""
+    day = due.date()
+    return localize(day + timedelta(days=_NEXT_GAP[mask][day.weekday()]), at, due.tzinfo)
+
+
+def day_end(due: datetime) -> datetime:
+    """Return the local midnight that ends `due`'s day."""
+    return localize(due.date() + timedelta(days=1), time(0, 0), due.tzinfo)
+
+
+def apply_override(
+    due: datetime, at: time, mask: int, override: DueOverride | None
+) -> tuple[datetime, DueOverride | None]:
+    """Return the effective next due and the override still in force.
+
+    An override only holds while `due` is still its occurrence; once that
+    dose is taken or its day rolls over, the next occurrence is due and the
+    override has expired.
+    """
+    if override is None or override.occurrence.timestamp() != due.timestamp():
+        return due, None
+    if override.until is None:
+        return following_due(due, at, mask), override
+    return override.until, override
+
+
+def classify(due: datetime, now: datetime) -> str:
+    """Classify a next-due datetime relative to `now`."""
+    # Compare instants: same-tzinfo comparisons ignore fold and DST offsets
+    if due.timestamp() < now.timestamp():
+        return DUE_OVERDUE
+    days = (due.date() - now.date()).days
+    if days == 0:
+        return DUE_TODAY
+    if days == 1:
+        return DUE_TOMORROW
+    return DUE_LATER
+
+
+def missed_days(
+    after: int,
+    until: int,
+    mask: int,
+    taken: list[int],
+    floor: int | None = None,
+) -> list[int]:
+    """Return scheduled days in (`after`, `until`] with no dose taken.
+
+    Days are proleptic ordinals. `taken` is the sorted list of local day
+    ordinals doses were taken on; it is merge-joined against the scheduled
+    days, which are generated by jumping through the gap table, so the cost
+    is linear in the number of days. Days before `floor` are not reported.
+    """
+    missed = []
+    index = 0
+    day = after + _NEXT_GAP[mask][(after - 1) % 7]
+    while day <= until:
+        while index < len(taken) and taken[index] < day:
+            index += 1
+        if (index == len(taken) or taken[index] != day) and (floor is None or day >= floor):
+            missed.append(day)
+        day += _NEXT_GAP[mask][(day - 1) % 7]
+    return missed
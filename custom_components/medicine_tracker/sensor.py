@@ -1,15 +1,18 @@
 """Platform for Medicine Tracker sensor."""
 from __future__ import annotations
 
-from datetime import datetime, time, timedelta
+from collections import deque
+from datetime import date, datetime, time, timedelta
 import logging
-import pytz
-from dateutil import rrule
+import time as monotonic
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.util import dt as dt_util
 
@@ -17,15 +20,39 @@ from .const import (
     DOMAIN, CONF_NAME, CONF_ICON, CONF_DOSAGE,
     CONF_PATIENT, CONF_SCHEDULE_DAYS, CONF_SCHEDULE_TIME,
     CONF_TIME_MODE, CONF_TZ_SENSOR, MODE_LOCAL_TIME,
-    CONF_MEDICINES
+    EVENT_DOSE_MISSED, EVENT_RULE_VIOLATION, RULE_ACTION_BLOCK,
+    CONF_START_DATE, CONF_END_DATE, CONF_COURSE_DOSES
 )
+from . import schedule, tztable
+from .labels import get_formatter
+from .doselog import (
+    RECORD_COMPLETED, RECORD_MISSED, RECORD_RESET, RECORD_SKIPPED,
+    RECORD_SNOOZED, RECORD_TAKEN
+)
+from .ingest import HISTORY_SIZE, merge_doses
 
 _LOGGER = logging.getLogger(__name__)
 
-WEEKDAY_MAP = {
-    "mon": rrule.MO, "tue": rrule.TU, "wed": rrule.WE,
-    "thu": rrule.TH, "fri": rrule.FR, "sat": rrule.SA,
-    "sun": rrule.SU
+# Longest outage the missed-dose sweep catches up on
+MAX_SWEEP_DAYS = 366
+
+# State computations whose duration is kept for diagnostics
+UPDATE_TIMINGS = 20
+
+# Seconds before a failed state computation is retried
+ERROR_RETRY = 60
+
+STATE_ERROR = "error"
+STATE_COMPLETED = "completed"
+
+# Icon per state
+STATE_ICONS = {
+    schedule.DUE_OVERDUE: "mdi:alert-circle",
+    schedule.DUE_TODAY: "mdi:clock-outline",
+    schedule.DUE_TOMORROW: "mdi:calendar-arrow-right",
+    schedule.DUE_LATER: "mdi:calendar",
+    STATE_ERROR: "mdi:alert",
+    STATE_COMPLETED: "mdi:check-circle",
 }
 
 async def async_setup_entry(
@@ -34,36 +61,43 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor platform from UI Config Entry."""
-    medicines_dict = entry.options.get(CONF_MEDICINES)
-    if medicines_dict is None:
-        medicines_dict = entry.data.get(CONF_MEDICINES, {})
-
+    data = entry.runtime_data
     patient_id = entry.data.get(CONF_PATIENT)
     global_tz_sensor = entry.options.get(CONF_TZ_SENSOR, entry.data.get(CONF_TZ_SENSOR))
 
+    # One device per patient groups their medicines
+    device_info = DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name=entry.title,
+        entry_type=DeviceEntryType.SERVICE,
+    )
+
     sensors = []
-    for med_id, med_data in medicines_dict.items():
-        time_str = med_data.get(CONF_SCHEDULE_TIME)
-        time_obj = time(8, 0)
-        if time_str:
-            try:
-                time_obj = datetime.strptime(time_str, "%H:%M:%S").time()
-            except ValueError:
-                pass 
-        
+    for med_id, medicine in data.medicines.items():
         config = {
-            CONF_NAME: med_data.get(CONF_NAME),
-            CONF_ICON: med_data.get(CONF_ICON),
-            CONF_DOSAGE: med_data.get(CONF_DOSAGE),
+            CONF_NAME: medicine.name,
+            CONF_ICON: medicine.icon,
+            CONF_DOSAGE: medicine.dosage,
             CONF_PATIENT: patient_id, 
-            CONF_SCHEDULE_DAYS: med_data.get(CONF_SCHEDULE_DAYS, []),
-            CONF_SCHEDULE_TIME: time_obj,
-            CONF_TIME_MODE: med_data.get(CONF_TIME_MODE),
+            CONF_SCHEDULE_DAYS: medicine.days,
+            CONF_SCHEDULE_TIME: medicine.schedule_time,
+            CONF_TIME_MODE: medicine.time_mode,
             CONF_TZ_SENSOR: global_tz_sensor, 
+            CONF_START_DATE: medicine.start_date,
+            CONF_END_DATE: medicine.end_date,
+            CONF_COURSE_DOSES: medicine.course_doses,
         }
         
         unique_id = f"{entry.entry_id}_{med_id}"
-        sensors.append(MedicineSensor(config, unique_id))
+        sensor = MedicineSensor(
+            config, unique_id, med_id=med_id, data=data, device_info=device_info
+        )
+        data.sensors[med_id] = sensor
+        sensors.append(sensor)
+        sensors.extend(
+            MedicineTimestampSensor(sensor, kind, device_info)
+            for kind in TIMESTAMP_SENSORS
+        )
     
     async_add_entities(sensors)
 
@@ -71,9 +105,20 @@ async def async_setup_entry(
 class MedicineSensor(SensorEntity, RestoreEntity):
     """Representation of a Medicine Tracker Sensor."""
 
-    def __init__(self, config, unique_id=None):
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = [*STATE_ICONS]
+    # The deadline timer, zone changes and services drive every update
+    _attr_should_poll = False
+    _attr_translation_key = "medicine"
+    # The label follows the state; recording it would only duplicate it
+    _unrecorded_attributes = frozenset({"label"})
+
+    def __init__(self, config, unique_id=None, med_id=None, data=None, device_info=None):
         """Initialize the sensor."""
         self._attr_unique_id = unique_id
+        self._attr_device_info = device_info
+        self._med_id = med_id
+        self._data = data
         self._name = config[CONF_NAME]
         self._icon_default = config[CONF_ICON]
         self._icon = self._icon_default
@@ -81,15 +126,38 @@ class MedicineSensor(SensorEntity, RestoreEntity):
         self._patient_entity_id = config.get(CONF_PATIENT)
         
         self._schedule_time = config[CONF_SCHEDULE_TIME]
-        self._schedule_days = config[CONF_SCHEDULE_DAYS]
+        self._schedule_mask = config[CONF_SCHEDULE_DAYS]
+        self._schedule_days = schedule.weekday_names(self._schedule_mask)
         
         self._time_mode = config.get(CONF_TIME_MODE)
         self._tz_sensor = config.get(CONF_TZ_SENSOR)
+
+        # Course bounds are dates; their attributes are formatted once, here
+        self._start_date = config.get(CONF_START_DATE)
+        self._end_date = config.get(CONF_END_DATE)
+        self._course_attributes = {
+            key: value.isoformat()
+            for key, value in (("start_date", self._start_date), ("end_date", self._end_date))
+            if value
+        }
+        self._course_doses = config.get(CONF_COURSE_DOSES) or 0
+        self._course_taken = 0
+        self._completed = False
         
-        self._state = "Unknown"
+        self._state = None
+        self._label = None
         self._next_due = None
+        self._scheduled_due = None
+        self._override = None
         self._patient_name = None
         self._history = [] 
+        self._missed = []
+        self._last_sweep = None
+        self._cancel_deadline = None
+        self._deadline = None
+        self._listeners = []
+        # Durations of the most recent state computations, in seconds
+        self._timings = deque(maxlen=UPDATE_TIMINGS)
 
     @property
     def name(self):
@@ -102,7 +170,12 @@ class MedicineSensor(SensorEntity, RestoreEntity):
     @property
     def icon(self):
         return self._icon
-    
+
+    @property
+    def history(self):
+        """Return the sorted dose history."""
+        return self._history
+
     @property
     def last_taken(self):
         """Return the last taken time from history."""
@@ -110,6 +183,29 @@ class MedicineSensor(SensorEntity, RestoreEntity):
             return self._history[-1]
         return None
 
+    @property
+    def next_due(self):
+        """Return the effective next due time."""
+        return self._next_due
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call `update_callback` whenever this sensor publishes a new state."""
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    @callback
+    def _async_notify_listeners(self):
+        """Let the companion sensors follow this sensor's state."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_publish(self):
+        """Write the state and notify the companion sensors."""
+        self.async_write_ha_state()
+        self._async_notify_listeners()
+
     @property
     def extra_state_attributes(self):
         attributes = {
@@ -126,9 +222,30 @@ class MedicineSensor(SensorEntity, RestoreEntity):
             
         if self._next_due:
             attributes["next_due"] = self._next_due.isoformat()
+            attributes["due_at"] = int(self._next_due.timestamp())
+
+        if self._label:
+            attributes["label"] = self._label
         
         if self._history:
             attributes["history"] = [d.isoformat() for d in self._history]
+
+        if self._missed:
+            attributes["missed"] = [d.isoformat() for d in self._missed]
+
+        if self._last_sweep:
+            attributes["last_sweep"] = date.fromordinal(self._last_sweep).isoformat()
+
+        attributes.update(self._course_attributes)
+        if self._course_doses:
+            attributes["course_doses"] = self._course_doses
+            attributes["course_taken"] = self._course_taken
+
+        if self._override and self._override.until:
+            attributes["snoozed_due"] = self._override.occurrence.isoformat()
+            attributes["snoozed_until"] = self._override.until.isoformat()
+        elif self._override:
+            attributes["skipped_due"] = self._override.occurrence.isoformat()
             
         return attributes
 
@@ -164,127 +281,260 @@ class MedicineSensor(SensorEntity, RestoreEntity):
                         self._history = [old_last]
                 except Exception:
                     pass
+
+            # Missed-dose sweep state
+            if last_state.attributes.get("missed"):
+                self._missed = [
+                    d for d in map(dt_util.parse_datetime, last_state.attributes["missed"])
+                    if d
+                ]
+            if last_state.attributes.get("last_sweep"):
+                try:
+                    self._last_sweep = date.fromisoformat(
+                        last_state.attributes["last_sweep"]
+                    ).toordinal()
+                except ValueError:
+                    pass
+
+            # Course progress; a completed course is not completed again
+            self._course_taken = last_state.attributes.get("course_taken") or 0
+            self._completed = last_state.state == STATE_COMPLETED
+
+            # Snooze or skip of the next occurrence
+            attributes = last_state.attributes
+            if attributes.get("snoozed_due") and attributes.get("snoozed_until"):
+                occurrence = dt_util.parse_datetime(attributes["snoozed_due"])
+                until = dt_util.parse_datetime(attributes["snoozed_until"])
+                if occurrence and until:
+                    self._override = schedule.DueOverride(occurrence, until)
+            elif attributes.get("skipped_due"):
+                occurrence = dt_util.parse_datetime(attributes["skipped_due"])
+                if occurrence:
+                    self._override = schedule.DueOverride(occurrence)
         
+        self.async_on_remove(self._cancel_deadline_timer)
+        if self._follows_zone:
+            self.async_on_remove(
+                self._data.zone.async_add_listener(self._async_zone_changed)
+            )
         self._update_state()
+        # Companions added before this sensor pick up its restored state
+        self._async_notify_listeners()
+
+    async def async_update(self):
+        """Update the entity state."""
+        self._update_state()
+        self._async_notify_listeners()
+
+    def diagnostics(self):
+        """Return a snapshot of the compiled schedule and recent timings."""
+        def iso(value):
+            return value.isoformat() if value else None
+
+        override = None
+        if self._override:
+            override = {
+                "occurrence": iso(self._override.occurrence),
+                "until": iso(self._override.until),
+            }
+        return {
+            "entity_id": self.entity_id,
+            "name": self._name,
+            "state": self._state,
+            "schedule": {
+                "time": self._schedule_time.strftime("%H:%M"),
+                "days_mask": self._schedule_mask,
+                "time_mode": self._time_mode,
+                "follows_zone": self._follows_zone,
+                "start_date": self._course_attributes.get("start_date"),
+                "end_date": self._course_attributes.get("end_date"),
+                "course_doses": self._course_doses,
+                "course_taken": self._course_taken,
+                "completed": self._completed,
+            },
+            "timezone": str(self._get_current_timezone()),
+            "scheduled_due": iso(self._scheduled_due),
+            "next_due": iso(self._next_due),
+            "override": override,
+            "deadline": iso(self._deadline),
+            "history_size": len(self._history),
+            "missed_size": len(self._missed),
+            "last_sweep": iso(self._last_sweep and date.fromordinal(self._last_sweep)),
+            "update_ms": [round(duration * 1000, 3) for duration in self._timings],
+        }
+
+    @property
+    def _follows_zone(self):
+        """Whether this medicine follows the patient's timezone sensor."""
+        return (
+            self._time_mode == MODE_LOCAL_TIME
+            and self._tz_sensor is not None
+            and self._data is not None
+            and self._data.zone is not None
+        )
 
-    async def async_update(self):
-        """Update the entity state."""
-        self._update_state()
-
     def _get_current_timezone(self):
         """Determine the effective timezone."""
-        if self._time_mode == MODE_LOCAL_TIME and self._tz_sensor:
-            tz_state = self.hass.states.get(self._tz_sensor)
-            if tz_state and tz_state.state != "unknown":
-                try:
-                    return pytz.timezone(tz_state.state)
-                except pytz.UnknownTimeZoneError:
-                    pass
+        if self._follows_zone and self._data.zone.zone is not None:
+            return self._data.zone.zone
         return dt_util.DEFAULT_TIME_ZONE
 
+    @callback
+    def _async_zone_changed(self):
+        """Recompute once for a zone change that took effect."""
+        if self._completed:
+            return
+        self._update_state()
+        self._async_publish()
+
     def _update_state(self):
-        """Calculate next due date and set descriptive state."""
+        """Calculate next due date and set the state key, icon and label."""
+        started = monotonic.perf_counter()
         try:
             tz = self._get_current_timezone()
             now_in_tz = dt_util.now(time_zone=tz)
-            
-            freq = rrule.DAILY
-            byweekday = None
-            
-            if self._schedule_days:
-                freq = rrule.WEEKLY
-                parsed_days = []
-                for d in self._schedule_days:
-                    if d in WEEKDAY_MAP:
-                        parsed_days.append(WEEKDAY_MAP[d])
-                byweekday = parsed_days
-
-            start_point = now_in_tz
-            rule = rrule.rrule(freq, byweekday=byweekday, dtstart=start_point)
-            
-            today_due = now_in_tz.replace(
-                hour=self._schedule_time.hour, 
-                minute=self._schedule_time.minute, 
-                second=0, microsecond=0
+            self._sweep_missed(now_in_tz)
+
+            # Before the course starts, schedule from its first day
+            since = now_in_tz
+            if self._start_date and now_in_tz.date() < self._start_date:
+                since = schedule.localize(self._start_date, time(0, 0), tz)
+            self._scheduled_due = schedule.next_due(
+                since, self._schedule_time, self._schedule_mask, self.last_taken
             )
+            if self._course_finished():
+                self._complete(now_in_tz)
+                return
+            self._completed = False
 
-            calculated_next = None
-
-            # Check if taken today
-            taken_today = False
-            if self.last_taken:
-                last_taken_local = self.last_taken.astimezone(tz)
-                if last_taken_local.date() == now_in_tz.date():
-                    taken_today = True
-
-            if taken_today:
-                # Taken today: Find next occurrence (likely tomorrow or later)
-                next_occurrence = rule.after(now_in_tz)
-                if next_occurrence:
-                    calculated_next = next_occurrence.replace(
-                        hour=self._schedule_time.hour, 
-                        minute=self._schedule_time.minute,
-                        second=0, microsecond=0
-                    )
-            else:
-                # Not taken today: Check if we passed the time or it's coming up
-                if now_in_tz > today_due:
-                    # Time passed: It is Overdue
-                    calculated_next = today_due
-                else:
-                    # Time is in future today
-                    calculated_next = today_due
-                
-                # Verify day constraint (if today is not a scheduled day)
-                if self._schedule_days:
-                    weekday_str = now_in_tz.strftime("%a").lower()
-                    if weekday_str not in self._schedule_days:
-                        # Today invalid, find next
-                        next_occurrence = rule.after(now_in_tz)
-                        calculated_next = next_occurrence.replace(
-                            hour=self._schedule_time.hour, 
-                            minute=self._schedule_time.minute,
-                            second=0, microsecond=0
-                        )
-
-            self._next_due = calculated_next
-            
-            if self._next_due:
-                # -- IMPROVED STATE LOGIC --
-                is_overdue = self._next_due < now_in_tz
-                is_today = self._next_due.date() == now_in_tz.date()
-                is_tomorrow = self._next_due.date() == (now_in_tz.date() + timedelta(days=1))
-
-                if is_overdue:
-                    self._state = "Overdue"
-                    self._icon = "mdi:alert-circle"
-                elif is_today:
-                    # Format time as 12-hour
-                    hour = self._next_due.strftime("%I").lstrip("0")
-                    minute = self._next_due.strftime("%M")
-                    ampm = self._next_due.strftime("%p")
-                    
-                    if minute == "00":
-                        time_fmt = f"{hour} {ampm}"
-                    else:
-                        time_fmt = f"{hour}:{minute} {ampm}"
-
-                    self._state = f"Due at {time_fmt}"
-                    self._icon = "mdi:clock-outline"
-                elif is_tomorrow:
-                    self._state = "Due Tomorrow"
-                    self._icon = "mdi:calendar-arrow-right"
-                else:
-                    self._state = f"Due {self._next_due.strftime('%A')}"
-                    self._icon = "mdi:calendar"
-            else:
-                self._state = "Unknown"
-                self._icon = "mdi:help-circle"
+            self._next_due, self._override = schedule.apply_override(
+                self._scheduled_due, self._schedule_time, self._schedule_mask, self._override
+            )
+            self._state = schedule.classify(self._next_due, now_in_tz)
+            self._icon = STATE_ICONS[self._state]
+            self._label = get_formatter(self.hass.config.language).format(
+                self._state, self._next_due
+            )
+
+            self._arm_deadline(now_in_tz)
 
         except Exception as e:
             _LOGGER.error(f"Error updating medicine {self._name}: {e}")
-            self._state = "Error"
-            self._icon = "mdi:alert"
+            self._state = STATE_ERROR
+            self._icon = STATE_ICONS[STATE_ERROR]
+            self._label = None
+            # Nothing polls, so try again later
+            self._cancel_deadline_timer()
+            self._cancel_deadline = async_call_later(
+                self.hass, ERROR_RETRY, self._async_deadline_reached
+            )
+        finally:
+            self._timings.append(monotonic.perf_counter() - started)
+
+    def _course_finished(self):
+        """Whether the course has no doses left."""
+        if self._course_doses and self._course_taken >= self._course_doses:
+            return True
+        return bool(self._end_date and self._scheduled_due.date() > self._end_date)
+
+    @callback
+    def _complete(self, now):
+        """Go dormant: no timers and no further writes of its own."""
+        if not self._completed:
+            self._completed = True
+            self._log(RECORD_COMPLETED, now, doses=self._course_taken)
+        self._cancel_deadline_timer()
+        self._state = STATE_COMPLETED
+        self._icon = STATE_ICONS[STATE_COMPLETED]
+        self._label = None
+        self._next_due = None
+        self._scheduled_due = None
+        self._override = None
+
+    @callback
+    def _log(self, kind, when=None, **extra):
+        """Append a record to the entry's dose log."""
+        if self._data is not None and self._data.log is not None:
+            self._data.log.append(kind, self._med_id, self._name, when, **extra)
+
+    def _taken_days(self, tz):
+        """Sorted local day ordinals that doses were taken on."""
+        return sorted({
+            tztable.get_table(tz, ts).local_ordinal(ts)
+            for ts in (dose.timestamp() for dose in self._history)
+        })
+
+    def _sweep_missed(self, now):
+        """Record missed doses for scheduled days that ended since the last sweep."""
+        yesterday = now.date().toordinal() - 1
+        if self._last_sweep is None:
+            self._last_sweep = yesterday
+            return
+        # The cursor never moves back, say when the zone or the clock does,
+        # so days already swept are not recorded twice
+        if self._last_sweep >= yesterday:
+            return
+
+        tz = now.tzinfo
+        taken = self._taken_days(tz)
+        # With a full history, days before its oldest dose are unknown
+        floor = taken[0] if len(self._history) >= HISTORY_SIZE else None
+        # Nothing is missed outside the course
+        if self._start_date:
+            floor = max(floor or 0, self._start_date.toordinal())
+        until = yesterday
+        if self._end_date:
+            until = min(until, self._end_date.toordinal())
+        if self._override and self._override.until is None:
+            # A skipped dose is not a missed one
+            skipped = self._override.occurrence.timestamp()
+            taken = sorted({*taken, tztable.get_table(tz, skipped).local_ordinal(skipped)})
+
+        for day in schedule.missed_days(
+            max(self._last_sweep, yesterday - MAX_SWEEP_DAYS),
+            until,
+            self._schedule_mask,
+            taken,
+            floor,
+        ):
+            due = schedule.localize(date.fromordinal(day), self._schedule_time, tz)
+            self._missed.append(due)
+            self._log(RECORD_MISSED, due)
+            self.hass.bus.async_fire(
+                EVENT_DOSE_MISSED,
+                {"entity_id": self.entity_id, "name": self._name, "due": due.isoformat()},
+            )
+
+        self._missed = self._missed[-HISTORY_SIZE:]
+        self._last_sweep = yesterday
+
+    @callback
+    def _arm_deadline(self, now):
+        """Arm the deadline timer for the next rollover or dose time."""
+        self._cancel_deadline_timer()
+        deadline = schedule.localize(now.date() + timedelta(days=1), time(0, 0), now.tzinfo)
+        if self._next_due and now.timestamp() < self._next_due.timestamp() < deadline.timestamp():
+            deadline = self._next_due
+
+        # Delay rather than a point in time, so it always lies ahead
+        delay = max(deadline.timestamp() - now.timestamp(), 1)
+        self._cancel_deadline = async_call_later(self.hass, delay, self._async_deadline_reached)
+        self._deadline = deadline
+
+    @callback
+    def _cancel_deadline_timer(self):
+        """Cancel the pending deadline timer, if any."""
+        if self._cancel_deadline:
+            self._cancel_deadline()
+            self._cancel_deadline = None
+        self._deadline = None
+
+    async def _async_deadline_reached(self, _now):
+        """Deadline timer callback: recompute and write the state."""
+        self._cancel_deadline = None
+        self._deadline = None
+        await self.async_update()
+        self.async_write_ha_state()
 
     async def mark_taken(self, custom_date=None):
         """Action: Mark the medicine as taken and log to history."""
@@ -294,15 +544,152 @@ class MedicineSensor(SensorEntity, RestoreEntity):
                 done_time = done_time.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
         else:
             done_time = dt_util.now()
-            
-        self._history.append(done_time)
-        self._history.sort()
-        self._history = self._history[-10:]
+
+        self._check_rules(done_time)
+        await self.add_doses([done_time])
+
+    def _check_rules(self, when):
+        """Apply the patient's dose rules, raising or reporting violations."""
+        if self._data is None:
+            return
+        violations = self._data.rules.check(
+            self._med_id, when, self._data.history_of, self._get_current_timezone()
+        )
+        for violation in violations:
+            self.hass.bus.async_fire(
+                EVENT_RULE_VIOLATION,
+                {
+                    "entity_id": self.entity_id,
+                    "name": self._name,
+                    "rule": violation.rule,
+                    "message": violation.message,
+                    "time_taken": when.isoformat(),
+                    "blocked": self._data.rule_action == RULE_ACTION_BLOCK,
+                },
+            )
+        if violations and self._data.rule_action == RULE_ACTION_BLOCK:
+            raise ServiceValidationError(
+                "; ".join(violation.message for violation in violations)
+            )
+
+    async def add_doses(self, doses):
+        """Action: Merge a batch of dose times into history with one write."""
+        doses = sorted(
+            dose if dose.tzinfo else dose.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+            for dose in doses
+        )
+        known = {dose.timestamp() for dose in self._history}
+        # Once the history is full, doses older than it cannot be told apart
+        # from replays of doses it no longer holds, so they are ignored
+        floor = None
+        if len(self._history) >= HISTORY_SIZE:
+            floor = self._history[0].timestamp()
+        merged = merge_doses(self._history, doses, limit=len(self._history) + len(doses))
+        for dose in merged:
+            ts = dose.timestamp()
+            if ts not in known and (floor is None or ts > floor):
+                self._log(RECORD_TAKEN, dose)
+                self._course_taken += 1
+        self._history = merged[-HISTORY_SIZE:]
+
+        if self._missed:
+            # A late dose cancels the miss recorded for its day
+            tz = self._get_current_timezone()
+            taken = set(self._taken_days(tz))
+            self._missed = [
+                due for due in self._missed
+                if tztable.get_table(tz, due.timestamp()).local_ordinal(due.timestamp()) not in taken
+            ]
+
         self._update_state()
-        self.async_write_ha_state()
+        self._async_publish()
+
+    async def snooze(self, duration):
+        """Action: Push the next dose back by `duration`, for this occurrence only."""
+        self._update_state()
+        if self._scheduled_due is None:
+            raise ServiceValidationError(f"{self._name} has no dose to snooze")
+        if self._override and self._override.until is None:
+            raise ServiceValidationError(f"The next dose of {self._name} is skipped")
+
+        now = dt_util.now(time_zone=self._get_current_timezone())
+        base = max(now.timestamp(), self._next_due.timestamp())
+        until = datetime.fromtimestamp(
+            base + duration.total_seconds(), self._scheduled_due.tzinfo
+        )
+        # Missed doses are tracked per day, so a snooze cannot cross into the next
+        if until.timestamp() >= schedule.day_end(self._scheduled_due).timestamp():
+            raise ServiceValidationError(
+                f"Cannot snooze {self._name} past the end of the day it is due"
+            )
+
+        self._override = schedule.DueOverride(self._scheduled_due, until)
+        self._log(RECORD_SNOOZED, self._scheduled_due, until=until.isoformat())
+        self._update_state()
+        self._async_publish()
+
+    async def skip(self):
+        """Action: Skip the next dose; it is neither due nor missed."""
+        self._update_state()
+        if self._scheduled_due is None:
+            raise ServiceValidationError(f"{self._name} has no dose to skip")
+
+        self._override = schedule.DueOverride(self._scheduled_due)
+        self._log(RECORD_SKIPPED, self._scheduled_due)
+        self._update_state()
+        self._async_publish()
 
     async def reset_history(self):
         """Action: Clear history."""
         self._history = []
+        self._missed = []
+        self._last_sweep = None
+        self._override = None
+        self._course_taken = 0
+        self._log(RECORD_RESET)
         self._update_state()
-        self.async_write_ha_state()
\ No newline at end of file
+        self._async_publish()
+
+
+# Companion timestamp sensors: (key, name suffix, icon, MedicineSensor property)
+TIMESTAMP_SENSORS = (
+    ("next_due", "Next Due", "mdi:clock-start", "next_due"),
+    ("last_taken", "Last Taken", "mdi:history", "last_taken"),
+)
+
+
+class MedicineTimestampSensor(SensorEntity):
+    """A timestamp of a medicine sensor, for native time triggers.
+
+    It holds no state of its own: it mirrors one property of its medicine
+    sensor and is written only when that value changes.
+    """
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_should_poll = False
+
+    def __init__(self, medicine: MedicineSensor, kind, device_info) -> None:
+        """Initialize the companion of `medicine`."""
+        key, suffix, icon, self._property = kind
+        self._medicine = medicine
+        self._attr_unique_id = f"{medicine.unique_id}_{key}"
+        self._attr_name = f"{medicine.name} {suffix}"
+        self._attr_icon = icon
+        self._attr_device_info = device_info
+        self._attr_native_value = getattr(medicine, self._property)
+
+    async def async_added_to_hass(self):
+        """Follow the medicine sensor."""
+        await super().async_added_to_hass()
+        self._attr_native_value = getattr(self._medicine, self._property)
+        self.async_on_remove(
+            self._medicine.async_add_listener(self._async_medicine_updated)
+        )
+
+    @callback
+    def _async_medicine_updated(self):
+        """Write the state if the mirrored timestamp changed."""
+        value = getattr(self._medicine, self._property)
+        if value != self._attr_native_value:
+            self._attr_native_value = value
+            self.async_write_ha_state()
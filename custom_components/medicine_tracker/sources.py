@@ -0,0 +1,143 @@
+"""Schedule sources: medicines read from a file in the config directory.
+
+A config entry can name an iCalendar file (.ics) or a prescription file
+(YAML or JSON, in the import_regimen format), relative to the config
+directory. Its medicines are added to the entry's own, read-only, so a
+clinician's regimen drives the sensors directly.
+
+A file is parsed once: the result is cached by path and modification time,
+so reloads and other entries naming the same file reuse it. Every
+SOURCE_CHECK_INTERVAL only the modification time is checked, and the entry
+is reloaded when it has changed.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import timedelta, tzinfo
+import logging
+import os
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util, slugify
+
+from .ical import CalendarError, parse_calendar
+from .models import Medicine
+from .regimen import RegimenError, parse_regimen
+
+_LOGGER = logging.getLogger(__name__)
+
+SOURCE_CHECK_INTERVAL = timedelta(minutes=5)
+
+# Medicine ids from a source start with this, so they never clash with the
+# entry's own
+SOURCE_PREFIX = "source_"
+
+ICAL_SUFFIXES = (".ics", ".ical", ".icalendar")
+
+
+@dataclass(frozen=True, slots=True)
+class SourceSnapshot:
+    """The medicines of a source file, as of one modification time."""
+
+    path: str
+    # Modification time in nanoseconds; None if the file is missing
+    mtime: int | None
+    medicines: dict[str, Medicine] = field(default_factory=dict)
+    error: str | None = None
+
+
+# Parsed sources by (path, home zone)
+_CACHE: dict[tuple[str, str], SourceSnapshot] = {}
+# Loads answered from _CACHE or by parsing, for diagnostics
+_STATS = {"hits": 0, "misses": 0}
+
+
+def source_path(config_dir: str, name: str) -> str | None:
+    """Return the path of a source file, None if it is outside `config_dir`."""
+    config_dir = os.path.realpath(config_dir)
+    path = os.path.realpath(os.path.join(config_dir, name))
+    if os.path.commonpath([config_dir, path]) != config_dir:
+        return None
+    return path
+
+
+def file_mtime(path: str) -> int | None:
+    """Return the modification time of `path`, None if it is missing."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def parse_source(path: str, text: str, tz: tzinfo) -> dict[str, Medicine]:
+    """Parse a source file's text into medicines keyed by medicine id."""
+    if path.lower().endswith(ICAL_SUFFIXES):
+        return {
+            f"{SOURCE_PREFIX}{slugify(uid)}": medicine
+            for uid, medicine in parse_calendar(text, tz).items()
+        }
+
+    medicines = {}
+    for medicine in parse_regimen(text):
+        # Prescriptions have no ids; the name is stable enough across edits
+        med_id = base = f"{SOURCE_PREFIX}{slugify(medicine.name)}"
+        suffix = 2
+        while med_id in medicines:
+            med_id = f"{base}_{suffix}"
+            suffix += 1
+        medicines[med_id] = medicine
+    return medicines
+
+
+def read_source(path: str, tz: tzinfo, cached: SourceSnapshot | None) -> SourceSnapshot:
+    """Return the medicines of `path`, reusing `cached` if it is unchanged."""
+    mtime = file_mtime(path)
+    if cached is not None and cached.mtime == mtime:
+        return cached
+    if mtime is None:
+        return SourceSnapshot(path, None, error="File not found")
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            text = file.read()
+        medicines = parse_source(path, text, tz)
+    except (OSError, UnicodeDecodeError, CalendarError, RegimenError) as err:
+        # Cached too, so a broken file is not parsed again until it changes
+        return SourceSnapshot(path, mtime, error=str(err))
+    return SourceSnapshot(path, mtime, medicines)
+
+
+async def async_load_source(hass: HomeAssistant, name: str) -> SourceSnapshot:
+    """Return the medicines of the source file `name`."""
+    path = source_path(hass.config.config_dir, name)
+    if path is None:
+        return SourceSnapshot(name, None, error="File is outside the config directory")
+
+    tz = dt_util.DEFAULT_TIME_ZONE
+    key = (path, str(tz))
+    cached = _CACHE.get(key)
+    snapshot = await hass.async_add_executor_job(read_source, path, tz, cached)
+    _STATS["hits" if snapshot is cached else "misses"] += 1
+    _CACHE[key] = snapshot
+    return snapshot
+
+
+def cache_info() -> dict[str, int]:
+    """Return the size and hit counters of the source cache."""
+    return {"size": len(_CACHE), **_STATS}
+
+
+def async_track_source(
+    hass: HomeAssistant, entry: ConfigEntry, snapshot: SourceSnapshot
+) -> CALLBACK_TYPE:
+    """Reload `entry` once the source file of `snapshot` changes."""
+
+    async def _async_check(_now) -> None:
+        mtime = await hass.async_add_executor_job(file_mtime, snapshot.path)
+        if mtime != snapshot.mtime:
+            _LOGGER.debug("Schedule source %s changed, reloading", snapshot.path)
+            hass.config_entries.async_schedule_reload(entry.entry_id)
+
+    return async_track_time_interval(hass, _async_check, SOURCE_CHECK_INTERVAL)
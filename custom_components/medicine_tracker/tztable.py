@@ -0,0 +1,162 @@
+"""Precomputed timezone transition tables for Medicine Tracker.
+
+Each active zone gets a table of its UTC offset changes per year-long
+window, so "local HH:MM on date D" resolves to an absolute instant by
+bisection instead of re-deriving offsets through the tzinfo on every
+computation. DST gaps and folds are resolved by explicit policy.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import date, datetime, time, tzinfo
+
+# Policies for wall times skipped by a spring-forward gap
+NONEXISTENT_SHIFT_FORWARD = "shift_forward"  # 02:30 in a 1h gap -> 03:30
+NONEXISTENT_GAP_END = "gap_end"  # 02:30 in a 1h gap -> 03:00
+
+# Policies for wall times repeated by a fall-back fold
+AMBIGUOUS_EARLIEST = "earliest"
+AMBIGUOUS_LATEST = "latest"
+
+TABLE_SPAN = 366 * 86400  # Seconds covered by one table
+TABLE_PAD = 2 * 86400  # Overlap between neighbouring tables
+MAX_TABLES = 64
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_TABLES: dict[tuple[tzinfo, int], TransitionTable] = {}
+# Lookups served from _TABLES or built anew, for diagnostics
+_STATS = {"hits": 0, "misses": 0}
+
+
+def _offset(tz: tzinfo, ts: int) -> int:
+    """UTC offset of `tz` at `ts`, in seconds."""
+    return int(datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+
+class TransitionTable:
+    """UTC offsets of one zone over a fixed window."""
+
+    __slots__ = ("tz", "start", "end", "_instants", "_offsets", "_walls")
+
+    def __init__(self, tz: tzinfo, start: int, end: int) -> None:
+        """Scan `tz` for transitions between UTC seconds `start` and `end`."""
+        self.tz = tz
+        self.start = start
+        self.end = end
+
+        # _instants[i] is the UTC second transition i takes effect, with
+        # _offsets[i] in force before it and _offsets[i + 1] from it on.
+        self._instants: list[int] = []
+        self._offsets: list[int] = [_offset(tz, self.start)]
+
+        # Daily samples; transitions are months apart, so each change
+        # between two samples is one transition found by bisection.
+        previous = self.start
+        for sample in range(self.start + 86400, self.end + 86400, 86400):
+            offset = _offset(tz, sample)
+            if offset != self._offsets[-1]:
+                low, high = previous, sample
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if _offset(tz, middle) == offset:
+                        high = middle
+                    else:
+                        low = middle
+                self._instants.append(high)
+                self._offsets.append(offset)
+            previous = sample
+
+        # Local wall second at which each transition's gap or fold begins
+        self._walls = [
+            instant + min(self._offsets[i], self._offsets[i + 1])
+            for i, instant in enumerate(self._instants)
+        ]
+
+    @property
+    def transitions(self) -> list[tuple[int, int, int]]:
+        """(instant, offset before, offset after) for each transition."""
+        return [
+            (instant, self._offsets[i], self._offsets[i + 1])
+            for i, instant in enumerate(self._instants)
+        ]
+
+    def offset_at(self, ts: float) -> int:
+        """UTC offset in seconds at instant `ts`."""
+        return self._offsets[bisect_right(self._instants, ts)]
+
+    def local_ordinal(self, ts: float) -> int:
+        """Proleptic ordinal of the local date at instant `ts`."""
+        return _EPOCH_ORDINAL + int(ts + self.offset_at(ts)) // 86400
+
+    def resolve(
+        self,
+        day: date,
+        at: time,
+        nonexistent: str = NONEXISTENT_SHIFT_FORWARD,
+        ambiguous: str = AMBIGUOUS_EARLIEST,
+    ) -> datetime:
+        """Return the instant of wall-clock `at` on `day`, as an aware datetime."""
+        wall = (
+            (day.toordinal() - _EPOCH_ORDINAL) * 86400
+            + at.hour * 3600
+            + at.minute * 60
+            + at.second
+        )
+
+        index = bisect_right(self._walls, wall) - 1
+        if index < 0:
+            ts = wall - self._offsets[0]
+        else:
+            before = self._offsets[index]
+            after = self._offsets[index + 1]
+            if wall >= self._walls[index] + abs(after - before):
+                ts = wall - after
+            elif after > before:
+                # Gap: this wall time never happens
+                if nonexistent == NONEXISTENT_GAP_END:
+                    ts = self._instants[index]
+                else:
+                    ts = wall - before
+            elif ambiguous == AMBIGUOUS_LATEST:
+                # Fold: this wall time happens twice
+                ts = wall - after
+            else:
+                ts = wall - before
+
+        return datetime.fromtimestamp(ts, self.tz)
+
+
+def get_table(tz: tzinfo, around: float) -> TransitionTable:
+    """Return the cached transition table of `tz` covering `around`."""
+    window = int(around) // TABLE_SPAN
+    table = _TABLES.get((tz, window))
+    if table is None:
+        _STATS["misses"] += 1
+        if len(_TABLES) >= MAX_TABLES:
+            del _TABLES[next(iter(_TABLES))]
+        table = _TABLES[(tz, window)] = TransitionTable(
+            tz,
+            window * TABLE_SPAN - TABLE_PAD,
+            (window + 1) * TABLE_SPAN + TABLE_PAD,
+        )
+    else:
+        _STATS["hits"] += 1
+    return table
+
+
+def cache_info() -> dict[str, int]:
+    """Return the size and hit counters of the table cache."""
+    return {"size": len(_TABLES), **_STATS}
+
+
+def resolve(
+    day: date,
+    at: time,
+    tz: tzinfo,
+    nonexistent: str = NONEXISTENT_SHIFT_FORWARD,
+    ambiguous: str = AMBIGUOUS_EARLIEST,
+) -> datetime:
+    """Resolve wall-clock `at` on `day` in `tz` to an aware datetime."""
+    around = (day.toordinal() - _EPOCH_ORDINAL) * 86400
+    return get_table(tz, around).resolve(day, at, nonexistent, ambiguous)
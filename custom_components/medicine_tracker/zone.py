@@ -0,0 +1,152 @@
+"""Debounced tracking of a patient's timezone sensor.
+
+Phone-reported timezone sensors flap during travel, and drop to "unknown"
+or "unavailable" whenever the app loses contact. Every local-time medicine
+of an entry follows one ZoneTracker instead of reading the sensor itself:
+
+* unknown, unavailable and invalid values are ignored, so the last known
+  good zone stays in effect (and it is stored, so it survives restarts);
+* a new zone only takes effect once the sensor has reported it for
+  ZONE_DEBOUNCE seconds, and at most once per MIN_ZONE_INTERVAL;
+* flapping back to the current zone cancels a pending change.
+
+Listeners are called once per zone that takes effect.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import tzinfo
+import logging
+import time
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+ZONE_DEBOUNCE = 120  # Seconds a new zone must hold before it is used
+MIN_ZONE_INTERVAL = 15 * 60  # Seconds between two zone changes
+
+_IGNORED_STATES = (None, "", STATE_UNKNOWN, STATE_UNAVAILABLE)
+
+
+def zone_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding an entry's last known good zone."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.zone.{entry_id}")
+
+
+class ZoneTracker:
+    """The effective zone of one timezone sensor."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, entity_id: str) -> None:
+        """Initialize the tracker of `entity_id`."""
+        self.hass = hass
+        self.entity_id = entity_id
+        self.zone_name: str | None = None
+        self.zone: tzinfo | None = None
+        # Number of zone changes that took effect
+        self.changes = 0
+        self._store = zone_store(hass, entry_id)
+        self._candidate: tuple[str, tzinfo] | None = None
+        self._last_change: float | None = None
+        self._cancel_commit: CALLBACK_TYPE | None = None
+        self._unsub_state: CALLBACK_TYPE | None = None
+        self._listeners: list[CALLBACK_TYPE] = []
+
+    async def async_start(self) -> None:
+        """Load the last known good zone and start following the sensor."""
+        stored = await self._store.async_load()
+        if stored and stored.get("zone"):
+            zone = await dt_util.async_get_time_zone(stored["zone"])
+            if zone is not None:
+                self.zone_name, self.zone = stored["zone"], zone
+
+        self._unsub_state = async_track_state_change_event(
+            self.hass, [self.entity_id], self._async_state_changed
+        )
+        state = self.hass.states.get(self.entity_id)
+        if state is not None:
+            await self._async_reported(state.state)
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop following the sensor."""
+        if self._unsub_state:
+            self._unsub_state()
+            self._unsub_state = None
+        self._cancel_pending()
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call `update_callback` whenever a new zone takes effect."""
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    async def _async_state_changed(self, event: Event) -> None:
+        """Handle a new state of the timezone sensor."""
+        new_state = event.data["new_state"]
+        await self._async_reported(new_state.state if new_state else None)
+
+    async def _async_reported(self, value: str | None) -> None:
+        """Consider a value reported by the sensor."""
+        if value in _IGNORED_STATES:
+            # Keep the last known good zone, and any change still pending
+            return
+        if value == self.zone_name:
+            # Flapped back before the change took effect
+            self._cancel_pending()
+            return
+        if self._candidate is not None and value == self._candidate[0]:
+            return
+
+        zone = await dt_util.async_get_time_zone(value)
+        if zone is None:
+            _LOGGER.debug("Ignoring invalid zone %s from %s", value, self.entity_id)
+            return
+
+        if self.zone is None:
+            # Nothing known yet, so nothing to protect
+            await self._async_commit(value, zone)
+            return
+
+        self._cancel_pending()
+        self._candidate = (value, zone)
+        delay = ZONE_DEBOUNCE
+        if self._last_change is not None:
+            delay = max(delay, self._last_change + MIN_ZONE_INTERVAL - time.monotonic())
+        self._cancel_commit = async_call_later(self.hass, delay, self._async_debounced)
+
+    async def _async_debounced(self, _now) -> None:
+        """Debounce timer callback: apply the candidate if it still holds."""
+        self._cancel_commit = None
+        candidate, self._candidate = self._candidate, None
+        state = self.hass.states.get(self.entity_id)
+        if candidate is not None and state is not None and state.state == candidate[0]:
+            await self._async_commit(*candidate)
+
+    @callback
+    def _cancel_pending(self) -> None:
+        """Drop the pending zone change, if any."""
+        self._candidate = None
+        if self._cancel_commit:
+            self._cancel_commit()
+            self._cancel_commit = None
+
+    async def _async_commit(self, name: str, zone: tzinfo) -> None:
+        """Make `zone` the effective zone and tell the listeners."""
+        self._cancel_pending()
+        if self.zone is not None:
+            # Adopting a first zone does not count towards the rate limit
+            self._last_change = time.monotonic()
+        self.zone_name, self.zone = name, zone
+        self.changes += 1
+        await self._store.async_save({"zone": name})
+        for update_callback in list(self._listeners):
+            update_callback()
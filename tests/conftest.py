@@ -1,10 +1,23 @@
 """Global fixtures for Medicine Tracker integration."""
+import glob
+import os
 from unittest.mock import patch
 import pytest
 
+from pytest_homeassistant_custom_component.common import get_test_config_dir
+
+from custom_components.medicine_tracker.const import DOMAIN
+
 pytest_plugins = "pytest_homeassistant_custom_component"
 
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
     """Enable custom integrations defined in the test dir."""
     yield
+
+@pytest.fixture(autouse=True)
+def remove_dose_logs():
+    """Remove the dose logs tests leave in the shared config directory."""
+    yield
+    for path in glob.glob(os.path.join(get_test_config_dir(DOMAIN), "*.jsonl")):
+        os.remove(path)
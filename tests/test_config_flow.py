@@ -7,8 +7,11 @@ from homeassistant.data_entry_flow import FlowResultType
 from custom_components.medicine_tracker.const import (
     DOMAIN, CONF_MEDICINES, CONF_PATIENT, CONF_NAME, CONF_ICON,
     CONF_DOSAGE, CONF_SCHEDULE_TIME, CONF_SCHEDULE_DAYS,
-    CONF_TIME_MODE, CONF_TZ_SENSOR, MODE_HOME_TIME, CONF_MEDICINE_ID
+    CONF_TIME_MODE, CONF_TZ_SENSOR, MODE_HOME_TIME, CONF_MEDICINE_ID,
+    CONF_SEPARATE_FROM
 )
+from custom_components.medicine_tracker.config_flow import get_medicine_schema
+from homeassistant.helpers.selector import SelectOptionDict
 
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
@@ -83,6 +86,9 @@ async def test_options_flow_add_medicine(hass: HomeAssistant):
     assert len(medicines) == 1
     med_id = list(medicines.keys())[0]
     assert medicines[med_id][CONF_NAME] == "New Med"
+    # Stored normalized: minutes since midnight and a weekday bitmask
+    assert medicines[med_id][CONF_SCHEDULE_TIME] == 9 * 60
+    assert medicines[med_id][CONF_SCHEDULE_DAYS] == 0b1
 
 async def test_options_flow_edit_medicine(hass: HomeAssistant):
     """Test editing a medicine."""
@@ -128,6 +134,7 @@ async def test_options_flow_edit_medicine(hass: HomeAssistant):
     assert result["type"] == FlowResultType.CREATE_ENTRY
     medicines = result["data"][CONF_MEDICINES]
     assert medicines[med_id][CONF_NAME] == "New Name"
+    assert medicines[med_id][CONF_SCHEDULE_TIME] == 8 * 60
 
 async def test_options_flow_remove_medicine(hass: HomeAssistant):
     """Test removing a medicine."""
@@ -160,3 +167,67 @@ async def test_options_flow_remove_medicine(hass: HomeAssistant):
     assert result["type"] == FlowResultType.CREATE_ENTRY
     medicines = result["data"][CONF_MEDICINES]
     assert len(medicines) == 0
+
+async def test_options_flow_import_regimen(hass: HomeAssistant):
+    """Test importing several medicines in one options flow."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_PATIENT: "person.test", CONF_MEDICINES: {}},
+        entry_id="test_entry_id"
+    )
+    config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "import_regimen"}
+    )
+    assert result["step_id"] == "import_regimen"
+
+    # Invalid regimen keeps the form open with an error
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"regimen": '[{"name": "No Time"}]'}
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "invalid_regimen"}
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {"regimen": "- {name: Pill A, time: '08:00'}\n- {name: Pill B, time: '20:00', days: [sun]}"},
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    medicines = result["data"][CONF_MEDICINES]
+    assert sorted(med[CONF_NAME] for med in medicines.values()) == ["Pill A", "Pill B"]
+
+async def test_options_flow_shift_times(hass: HomeAssistant):
+    """Test shifting all medicine times in one options flow."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_PATIENT: "person.test", CONF_MEDICINES: {
+            "a": {CONF_NAME: "A", CONF_SCHEDULE_TIME: "08:00:00", CONF_SCHEDULE_DAYS: []},
+            "b": {CONF_NAME: "B", CONF_SCHEDULE_TIME: "20:00:00", CONF_SCHEDULE_DAYS: []},
+        }},
+        entry_id="test_entry_id"
+    )
+    config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "shift_times"}
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"minutes": 30}
+    )
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    medicines = result["data"][CONF_MEDICINES]
+    assert medicines["a"][CONF_SCHEDULE_TIME] == 8 * 60 + 30
+    assert medicines["b"][CONF_SCHEDULE_TIME] == 20 * 60 + 30
+
+async def test_medicine_schema_drops_stale_separations(hass: HomeAssistant):
+    """Test a separation from a medicine no longer offered is not a default."""
+    schema = get_medicine_schema(
+        defaults={CONF_NAME: "Iron", CONF_SEPARATE_FROM: ["gone", "thyroid"]},
+        others=[SelectOptionDict(value="thyroid", label="Thyroid")],
+    )
+
+    assert schema({CONF_NAME: "Iron"})[CONF_SEPARATE_FROM] == ["thyroid"]
@@ -0,0 +1,123 @@
+"""Tests for the Medicine Tracker iCalendar reader."""
+from datetime import date, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from custom_components.medicine_tracker.const import MODE_HOME_TIME, MODE_LOCAL_TIME
+from custom_components.medicine_tracker.ical import CalendarError, parse_calendar
+from custom_components.medicine_tracker.schedule import ALL_DAYS, weekday_mask
+
+CALENDAR = """BEGIN:VCALENDAR\r
+VERSION:2.0\r
+PRODID:-//Clinic//Prescriptions//EN\r
+BEGIN:VEVENT\r
+UID:amox-1@clinic\r
+SUMMARY:Amoxicillin\r
+DESCRIPTION:500mg\\, with food\\nFinish the course\r
+DTSTART:20240108T080000\r
+RRULE:FREQ=DAILY;COUNT=21\r
+BEGIN:VALARM\r
+ACTION:DISPLAY\r
+DESCRIPTION:Reminder\r
+TRIGGER:-PT5M\r
+END:VALARM\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:mtx-1@clinic\r
+SUMMARY:Metho\r
+ trexate\r
+DTSTART;TZID=Europe/London:20240105T190000\r
+RRULE:FREQ=WEEKLY;BYDAY=FR;UNTIL=20240329T235959Z\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:flu-1@clinic\r
+SUMMARY:Flu shot\r
+DTSTART:20240110T143000Z\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:old-1@clinic\r
+STATUS:CANCELLED\r
+SUMMARY:Old\r
+DTSTART:20240101T080000\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+async def test_parse_calendar():
+    """Test events become medicines with their schedule and course."""
+    medicines = parse_calendar(CALENDAR, ZoneInfo("America/New_York"))
+
+    assert list(medicines) == ["amox-1@clinic", "mtx-1@clinic", "flu-1@clinic"]
+
+    amox = medicines["amox-1@clinic"]
+    assert amox.name == "Amoxicillin"
+    # Only the first line, and not the alarm's description
+    assert amox.dosage == "500mg, with food"
+    assert (amox.time, amox.days, amox.time_mode) == (8 * 60, ALL_DAYS, MODE_LOCAL_TIME)
+    assert (amox.start_date, amox.end_date, amox.course_doses) == (date(2024, 1, 8), None, 21)
+
+    # 19:00 London is 14:00 in the home zone
+    mtx = medicines["mtx-1@clinic"]
+    assert mtx.name == "Methotrexate"
+    assert (mtx.time, mtx.days, mtx.time_mode) == (14 * 60, weekday_mask(["fri"]), MODE_HOME_TIME)
+    assert (mtx.start_date, mtx.end_date, mtx.course_doses) == (
+        date(2024, 1, 5), date(2024, 3, 29), 0
+    )
+
+    # A single dose at a UTC time, converted to the home zone
+    flu = medicines["flu-1@clinic"]
+    assert (flu.time, flu.days, flu.time_mode) == (
+        9 * 60 + 30, weekday_mask(["wed"]), MODE_HOME_TIME
+    )
+    assert (flu.start_date, flu.end_date, flu.course_doses) == (
+        date(2024, 1, 10), date(2024, 1, 10), 1
+    )
+
+
+async def test_zoned_times_convert_to_home_zone():
+    """Test TZID times are converted to the home zone, days moving along."""
+    text = (
+        "BEGIN:VCALENDAR\nBEGIN:VEVENT\nUID:a\nSUMMARY:Morning\n"
+        "DTSTART;TZID=America/New_York:20260301T080000\nRRULE:FREQ=DAILY\n"
+        "END:VEVENT\nBEGIN:VEVENT\nUID:b\nSUMMARY:Evening\n"
+        "DTSTART;TZID=America/New_York:20260227T200000\nRRULE:FREQ=WEEKLY;BYDAY=MO,FR\n"
+        "END:VEVENT\nEND:VCALENDAR\n"
+    )
+    medicines = parse_calendar(text, ZoneInfo("Europe/London"))
+
+    assert (medicines["a"].time, medicines["a"].time_mode) == (13 * 60, MODE_HOME_TIME)
+    # 20:00 Friday in New York is 01:00 Saturday in London
+    evening = medicines["b"]
+    assert evening.time == 60
+    assert evening.days == weekday_mask(["tue", "sat"])
+    assert evening.start_date == date(2026, 2, 28)
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        "SUMMARY:A\nDTSTART:20240101T080000\nRRULE:FREQ=MONTHLY",
+        "SUMMARY:A\nDTSTART:20240101T080000\nRRULE:FREQ=DAILY;INTERVAL=2",
+        "SUMMARY:A\nDTSTART:20240101T080000\nRRULE:FREQ=WEEKLY;BYDAY=1MO",
+        "SUMMARY:A\nDTSTART:20240101T080000\nRRULE:FREQ=DAILY;BYHOUR=8,20",
+        "SUMMARY:A\nDTSTART:20240101T080000\nRRULE:FREQ=DAILY\nEXDATE:20240102T080000",
+        "SUMMARY:A\nDTSTART:20240101T080000\nRRULE:FREQ=DAILY;UNTIL=20231231",
+        "SUMMARY:A\nDTSTART:yesterday",
+        "SUMMARY:A\nDTSTART;TZID=Mars/Olympus_Mons:20240101T080000",
+        "SUMMARY:A",
+        "DTSTART:20240101T080000",
+    ],
+)
+async def test_unsupported_events_are_errors(event):
+    """Test events the schedule model cannot represent are not dropped silently."""
+    text = f"BEGIN:VCALENDAR\nBEGIN:VEVENT\n{event}\nEND:VEVENT\nEND:VCALENDAR\n"
+    with pytest.raises(CalendarError):
+        parse_calendar(text, timezone.utc)
+
+
+async def test_empty_calendar_is_an_error():
+    """Test a file without events is rejected."""
+    with pytest.raises(CalendarError):
+        parse_calendar("BEGIN:VCALENDAR\nEND:VCALENDAR\n", timezone.utc)
@@ -0,0 +1,62 @@
+"""Tests for Medicine Tracker dose ingestion."""
+from datetime import datetime, timedelta, timezone
+
+from custom_components.medicine_tracker.ingest import (
+    HISTORY_SIZE,
+    group_events,
+    merge_doses,
+)
+
+BASE = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+
+async def test_group_events_sorts_per_entity():
+    """Test events are grouped per entity and sorted."""
+    grouped = group_events([
+        ("sensor.a", BASE + timedelta(days=1)),
+        ("sensor.b", BASE),
+        ("sensor.a", BASE),
+    ], timezone.utc)
+    assert grouped == {
+        "sensor.a": [BASE, BASE + timedelta(days=1)],
+        "sensor.b": [BASE],
+    }
+
+
+async def test_group_events_naive_times():
+    """Test naive times are placed in the given zone and sort with aware ones."""
+    grouped = group_events([
+        ("sensor.a", BASE + timedelta(hours=1)),
+        ("sensor.a", BASE.replace(tzinfo=None)),
+    ], timezone.utc)
+    assert grouped == {"sensor.a": [BASE, BASE + timedelta(hours=1)]}
+    assert all(dose.tzinfo is timezone.utc for dose in grouped["sensor.a"])
+
+
+async def test_merge_doses_dedups_and_trims():
+    """Test merging drops near-duplicates and keeps the newest doses."""
+    history = [BASE + timedelta(days=day) for day in range(0, 20, 2)]
+    doses = [
+        BASE + timedelta(days=1),
+        BASE + timedelta(days=18, seconds=20),  # Duplicate of a history entry
+        BASE + timedelta(days=19),
+    ]
+
+    merged = merge_doses(history, doses)
+
+    assert len(merged) == HISTORY_SIZE
+    assert merged == sorted(merged)
+    assert merged[-1] == BASE + timedelta(days=19)
+    assert BASE + timedelta(days=18) in merged
+    assert BASE + timedelta(days=18, seconds=20) not in merged
+
+
+async def test_merge_doses_keeps_history_entry():
+    """Test a replayed dose slightly earlier than a history entry is dropped."""
+    history = [BASE + timedelta(seconds=30)]
+
+    assert merge_doses(history, [BASE]) == history
+    # Only genuinely new doses are added
+    assert merge_doses(history, [BASE, BASE + timedelta(hours=1)]) == [
+        BASE + timedelta(seconds=30), BASE + timedelta(hours=1)
+    ]
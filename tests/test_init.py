@@ -1,15 +1,26 @@
 """Tests for the Medicine Tracker component initialization."""
+import os
 from unittest.mock import patch, AsyncMock
 import pytest
+from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.core import HomeAssistant
 from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
 
 from custom_components.medicine_tracker.const import (
     DOMAIN, CONF_MEDICINES, CONF_PATIENT, CONF_NAME, CONF_ICON,
     CONF_DOSAGE, CONF_SCHEDULE_TIME, CONF_SCHEDULE_DAYS,
-    CONF_TIME_MODE, MODE_HOME_TIME
+    CONF_TIME_MODE, MODE_HOME_TIME, CONF_SCHEDULE_SOURCE, CONF_SEPARATE_FROM,
+    CONF_SEPARATION,
+)
+from custom_components.medicine_tracker.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.medicine_tracker.doselog import append_lines
+from custom_components.medicine_tracker.sources import SOURCE_CHECK_INTERVAL
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry, async_capture_events, async_fire_time_changed,
 )
-from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 async def test_setup_entry(hass: HomeAssistant):
     """Test setting up the integration from a config entry."""
@@ -113,3 +124,416 @@ async def test_services(hass: HomeAssistant):
 
     state = hass.states.get(entity_id)
     assert len(state.attributes.get("history", [])) == 0
+
+async def test_setup_duration_in_diagnostics(hass: HomeAssistant):
+    """Test the entry's setup time is reported through diagnostics."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_PATIENT: "person.test_user", CONF_MEDICINES: {}}
+    )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["setup_duration_ms"] >= 0
+
+async def test_log_doses(hass: HomeAssistant):
+    """Test a late, out-of-order batch is merged with one write per sensor."""
+    med = {
+        CONF_SCHEDULE_TIME: "08:00:00",
+        CONF_SCHEDULE_DAYS: [],
+        CONF_TIME_MODE: MODE_HOME_TIME,
+        CONF_ICON: "mdi:pill",
+    }
+    entry = MockConfigEntry(domain=DOMAIN, data={
+        CONF_PATIENT: "person.test_user",
+        CONF_MEDICINES: {
+            "med1": {**med, CONF_NAME: "Batch A"},
+            "med2": {**med, CONF_NAME: "Batch B"},
+        },
+    })
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    changes = async_capture_events(hass, EVENT_STATE_CHANGED)
+    await hass.services.async_call(
+        DOMAIN,
+        "log_doses",
+        {
+            "events": [
+                {"entity_id": "sensor.batch_a", "time_taken": "2024-01-03T08:00:00+00:00"},
+                {"entity_id": "sensor.batch_b", "time_taken": "2024-01-02T08:00:00+00:00"},
+                {"entity_id": "sensor.batch_a", "time_taken": "2024-01-01T08:00:00+00:00"},
+                # Duplicate of the first event, replayed by the app
+                {"entity_id": "sensor.batch_a", "time_taken": "2024-01-03T08:00:30+00:00"},
+            ]
+        },
+        blocking=True,
+    )
+
+    # One write per medicine sensor, and at most one per companion sensor
+    written = [event.data["entity_id"] for event in changes]
+    assert sorted(set(written)) == sorted(written)
+    assert {"sensor.batch_a", "sensor.batch_b"} <= set(written)
+
+    history = hass.states.get("sensor.batch_a").attributes["history"]
+    assert history == ["2024-01-01T08:00:00+00:00", "2024-01-03T08:00:00+00:00"]
+    assert len(hass.states.get("sensor.batch_b").attributes["history"]) == 1
+
+async def test_migrate_entry_v1(hass: HomeAssistant):
+    """Test version 1 entries are migrated to typed, normalized medicines."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=1,
+        data={
+            CONF_PATIENT: "person.test_user",
+            CONF_MEDICINES: {
+                "med1": {
+                    CONF_NAME: "Old Pill",
+                    CONF_DOSAGE: "",
+                    CONF_SCHEDULE_TIME: "21:30:00",
+                    CONF_SCHEDULE_DAYS: ["mon", "fri"],
+                    CONF_TIME_MODE: MODE_HOME_TIME,
+                    CONF_ICON: "mdi:pill",
+                }
+            },
+        },
+        options={
+            CONF_MEDICINES: {
+                "med1": {
+                    CONF_NAME: "Old Pill",
+                    CONF_SCHEDULE_TIME: "21:30:00",
+                    CONF_SCHEDULE_DAYS: [],
+                    CONF_TIME_MODE: MODE_HOME_TIME,
+                }
+            }
+        },
+    )
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert entry.version == 2
+    assert entry.data[CONF_MEDICINES]["med1"] == {
+        CONF_NAME: "Old Pill",
+        CONF_ICON: "mdi:pill",
+        CONF_SCHEDULE_TIME: 21 * 60 + 30,
+        CONF_SCHEDULE_DAYS: 0b10001,
+        CONF_TIME_MODE: MODE_HOME_TIME,
+    }
+    assert entry.options[CONF_MEDICINES]["med1"][CONF_SCHEDULE_DAYS] == 0b1111111
+
+    state = hass.states.get("sensor.old_pill")
+    assert state.attributes["schedule_time"] == "21:30"
+
+async def test_bulk_services(hass: HomeAssistant):
+    """Test regimen import and time shifting each apply as one update."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_PATIENT: "person.test_user", CONF_MEDICINES: {}}
+    )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    with patch.object(
+        hass.config_entries, "async_reload", wraps=hass.config_entries.async_reload
+    ) as mock_reload:
+        await hass.services.async_call(
+            DOMAIN,
+            "import_regimen",
+            {
+                "config_entry_id": entry.entry_id,
+                "regimen": [
+                    {"name": "Bulk A", "time": "08:00"},
+                    {"name": "Bulk B", "time": "09:00", "days": ["mon"]},
+                    {"name": "Bulk C", "time": "10:00"},
+                ],
+            },
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+        assert mock_reload.call_count == 1
+
+    assert len(entry.options[CONF_MEDICINES]) == 3
+    assert hass.states.get("sensor.bulk_a").attributes["schedule_time"] == "08:00"
+
+    await hass.services.async_call(
+        DOMAIN,
+        "shift_times",
+        {"entity_id": ["sensor.bulk_a", "sensor.bulk_b"], "minutes": -30},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.bulk_a").attributes["schedule_time"] == "07:30"
+    assert hass.states.get("sensor.bulk_b").attributes["schedule_time"] == "08:30"
+    assert hass.states.get("sensor.bulk_c").attributes["schedule_time"] == "10:00"
+
+
+async def test_read_log(hass: HomeAssistant):
+    """Test dose events reach the log and are read back incrementally."""
+    entry = MockConfigEntry(domain=DOMAIN, data={
+        CONF_PATIENT: "person.test_user",
+        CONF_MEDICINES: {
+            "med1": {
+                CONF_NAME: "Logged Pill",
+                CONF_SCHEDULE_TIME: "08:00:00",
+                CONF_SCHEDULE_DAYS: [],
+                CONF_TIME_MODE: MODE_HOME_TIME,
+                CONF_ICON: "mdi:pill",
+            }
+        },
+    })
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    await hass.services.async_call(
+        DOMAIN,
+        "log_doses",
+        {"events": [
+            {"entity_id": "sensor.logged_pill", "time_taken": "2024-01-01T08:00:00+00:00"},
+            {"entity_id": "sensor.logged_pill", "time_taken": "2024-01-02T08:00:00+00:00"},
+        ]},
+        blocking=True,
+    )
+
+    page = await hass.services.async_call(
+        DOMAIN, "read_log",
+        {"config_entry_id": entry.entry_id, "limit": 1},
+        blocking=True, return_response=True,
+    )
+    assert [record["time"] for record in page["records"]] == ["2024-01-01T08:00:00+00:00"]
+    assert page["records"][0]["event"] == "taken"
+    assert page["records"][0]["med_id"] == "med1"
+    assert not page["end"]
+
+    # Resuming from the cursor returns only what is new; replays log nothing
+    await hass.services.async_call(
+        DOMAIN,
+        "log_doses",
+        {"events": [
+            {"entity_id": "sensor.logged_pill", "time_taken": "2024-01-02T08:00:10+00:00"},
+        ]},
+        blocking=True,
+    )
+    page = await hass.services.async_call(
+        DOMAIN, "read_log",
+        {"config_entry_id": entry.entry_id, "cursor": page["cursor"]},
+        blocking=True, return_response=True,
+    )
+    assert [record["time"] for record in page["records"]] == ["2024-01-02T08:00:00+00:00"]
+    assert page["end"]
+
+    # Once the history is full, doses older than it are not logged or counted
+    await hass.services.async_call(
+        DOMAIN,
+        "log_doses",
+        {"events": [
+            {"entity_id": "sensor.logged_pill", "time_taken": f"2024-02-{day:02d}T08:00:00+00:00"}
+            for day in range(1, 11)
+        ]},
+        blocking=True,
+    )
+    page = await hass.services.async_call(
+        DOMAIN, "read_log",
+        {"config_entry_id": entry.entry_id, "cursor": page["cursor"]},
+        blocking=True, return_response=True,
+    )
+    await hass.services.async_call(
+        DOMAIN,
+        "log_doses",
+        {"events": [
+            {"entity_id": "sensor.logged_pill", "time_taken": "2024-01-01T08:00:00+00:00"},
+        ]},
+        blocking=True,
+    )
+    page = await hass.services.async_call(
+        DOMAIN, "read_log",
+        {"config_entry_id": entry.entry_id, "cursor": page["cursor"]},
+        blocking=True, return_response=True,
+    )
+    assert page["records"] == []
+
+    # Removing the entry removes its log
+    path = entry.runtime_data.log.path
+    assert os.path.exists(path)
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not os.path.exists(path)
+
+
+async def test_dose_log_errors(hass: HomeAssistant):
+    """Test a failed write keeps its records and corrupt records are skipped."""
+    entry = MockConfigEntry(domain=DOMAIN, data={
+        CONF_PATIENT: "person.test_user",
+        CONF_MEDICINES: {
+            "med1": {
+                CONF_NAME: "Logged Pill",
+                CONF_SCHEDULE_TIME: "08:00:00",
+                CONF_SCHEDULE_DAYS: [],
+                CONF_TIME_MODE: MODE_HOME_TIME,
+                CONF_ICON: "mdi:pill",
+            }
+        },
+    })
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    log = entry.runtime_data.log
+
+    await hass.services.async_call(
+        DOMAIN,
+        "log_doses",
+        {"events": [
+            {"entity_id": "sensor.logged_pill", "time_taken": "2024-01-01T08:00:00+00:00"},
+        ]},
+        blocking=True,
+    )
+    with patch(
+        "custom_components.medicine_tracker.doselog.append_lines",
+        side_effect=OSError("disk full"),
+    ):
+        await log.async_flush()
+    assert log.pending == 1
+
+    page = await hass.services.async_call(
+        DOMAIN, "read_log", {"config_entry_id": entry.entry_id},
+        blocking=True, return_response=True,
+    )
+    assert [record["time"] for record in page["records"]] == ["2024-01-01T08:00:00+00:00"]
+
+    await hass.async_add_executor_job(append_lines, log.path, ["{not json\n"])
+    await hass.services.async_call(
+        DOMAIN,
+        "log_doses",
+        {"events": [
+            {"entity_id": "sensor.logged_pill", "time_taken": "2024-01-02T08:00:00+00:00"},
+        ]},
+        blocking=True,
+    )
+    page = await hass.services.async_call(
+        DOMAIN, "read_log",
+        {"config_entry_id": entry.entry_id, "cursor": page["cursor"]},
+        blocking=True, return_response=True,
+    )
+    assert [record["time"] for record in page["records"]] == ["2024-01-02T08:00:00+00:00"]
+    assert page["end"]
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_schedule_source(hass: HomeAssistant):
+    """Test a prescription file drives sensors and is re-read only once changed."""
+    name = os.path.join(DOMAIN, "test_prescription.yaml")
+    path = hass.config.path(name)
+
+    def write(text: str, mtime: int) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.utime(path, (mtime, mtime))
+
+    await hass.async_add_executor_job(
+        write, "- name: Clinic Pill\n  time: '08:00'\n  dosage: 5mg\n", 1_700_000_000
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_PATIENT: "person.test_user", CONF_MEDICINES: {}},
+        options={CONF_SCHEDULE_SOURCE: name},
+    )
+    entry.add_to_hass(hass)
+    try:
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert list(entry.runtime_data.medicines) == ["source_clinic_pill"]
+        assert hass.states.get("sensor.clinic_pill").attributes["dosage"] == "5mg"
+        source = entry.runtime_data.source
+
+        # An unchanged file is not parsed again on reload
+        await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert entry.runtime_data.source is source
+
+        async_fire_time_changed(hass, dt_util.utcnow() + SOURCE_CHECK_INTERVAL)
+        await hass.async_block_till_done(wait_background_tasks=True)
+        assert entry.runtime_data.source is source
+
+        # A changed file reloads the entry with the new regimen
+        await hass.async_add_executor_job(
+            write,
+            "- name: Clinic Pill\n  time: '09:00'\n- name: Evening Pill\n  time: '20:00'\n",
+            1_700_000_100,
+        )
+        async_fire_time_changed(hass, dt_util.utcnow() + SOURCE_CHECK_INTERVAL * 2)
+        await hass.async_block_till_done(wait_background_tasks=True)
+
+        assert entry.runtime_data.source is not source
+        assert entry.runtime_data.medicines["source_clinic_pill"].time == 9 * 60
+        assert hass.states.get("sensor.evening_pill") is not None
+    finally:
+        await hass.config_entries.async_remove(entry.entry_id)
+        await hass.async_add_executor_job(os.remove, path)
+
+
+async def test_diagnostics_snapshot(hass: HomeAssistant):
+    """Test diagnostics snapshot every medicine and redact patient details."""
+    entry = MockConfigEntry(domain=DOMAIN, data={
+        CONF_PATIENT: "person.test_user",
+        CONF_MEDICINES: {
+            "private_pill": {
+                CONF_NAME: "Private Pill",
+                CONF_DOSAGE: "5mg",
+                CONF_SCHEDULE_TIME: "08:00:00",
+                CONF_SCHEDULE_DAYS: ["mon", "wed"],
+                CONF_TIME_MODE: MODE_HOME_TIME,
+                CONF_ICON: "mdi:pill",
+            },
+            "other_pill": {
+                CONF_NAME: "Other Pill",
+                CONF_SCHEDULE_TIME: "20:00:00",
+                CONF_SEPARATE_FROM: ["private_pill"],
+                CONF_SEPARATION: 60,
+            },
+        },
+    })
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    await hass.services.async_call(
+        DOMAIN, "take_medicine", {"entity_id": "sensor.private_pill"}, blocking=True
+    )
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    # Keyed by position, as medicine ids can be derived from names
+    assert list(diagnostics["medicines"]) == ["medicine_1", "medicine_2"]
+    medicine = diagnostics["medicines"]["medicine_1"]
+    assert medicine["schedule"]["time"] == "08:00"
+    assert medicine["schedule"]["days_mask"] == 0b101
+    assert medicine["timezone"] == diagnostics["home_timezone"]
+    assert medicine["next_due"] is not None
+    assert medicine["deadline"] is not None
+    assert medicine["history_size"] == 1
+    assert medicine["update_ms"]
+    assert diagnostics["update_ms"]["count"] == sum(
+        len(item["update_ms"]) for item in diagnostics["medicines"].values()
+    )
+    assert diagnostics["caches"]["timezone_tables"]["hits"] > 0
+    assert 0 <= diagnostics["caches"]["labels"]["hit_rate"] <= 1
+
+    # Nothing identifies the patient or the medicine
+    assert medicine["name"] == "**REDACTED**"
+    assert medicine["entity_id"] == "**REDACTED**"
+    assert diagnostics["entry"]["data"][CONF_PATIENT] == "**REDACTED**"
+    stored = diagnostics["entry"]["data"][CONF_MEDICINES]["medicine_1"]
+    assert stored[CONF_NAME] == stored[CONF_DOSAGE] == "**REDACTED**"
+    assert diagnostics["entry"]["data"][CONF_MEDICINES]["medicine_2"][
+        CONF_SEPARATE_FROM
+    ] == ["medicine_1"]
+    assert "Private Pill" not in str(diagnostics)
+    assert "private_pill" not in str(diagnostics)
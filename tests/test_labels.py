@@ -0,0 +1,26 @@
+"""Tests for Medicine Tracker due labels."""
+from datetime import datetime
+
+from custom_components.medicine_tracker import schedule
+from custom_components.medicine_tracker.labels import get_formatter
+
+
+async def test_labels():
+    """Test labels match the original 12-hour English wording."""
+    formatter = get_formatter("en")
+    due = datetime(2024, 1, 3, 8, 0)
+
+    assert formatter.format(schedule.DUE_OVERDUE, due) == "Overdue"
+    assert formatter.format(schedule.DUE_TODAY, due) == "Due at 8 AM"
+    assert formatter.format(schedule.DUE_TODAY, due.replace(hour=0, minute=5)) == "Due at 12:05 AM"
+    assert formatter.format(schedule.DUE_TODAY, due.replace(hour=12, minute=30)) == "Due at 12:30 PM"
+    assert formatter.format(schedule.DUE_TOMORROW, due) == "Due Tomorrow"
+    assert formatter.format(schedule.DUE_LATER, due) == "Due Wednesday"
+
+
+async def test_formatter_cached_per_language():
+    """Test one formatter per language, with English as the fallback."""
+    assert get_formatter("en") is get_formatter("en")
+    assert get_formatter("en-GB").language == "en"
+    assert get_formatter("xx").language == "en"
+    assert get_formatter(None).language == "en"
@@ -0,0 +1,219 @@
+"""Load test: a household of phones and dashboards driving Medicine Tracker.
+
+Many patients with large regimens are set up, then a seeded random mix of
+concurrent take_medicine / reset_history calls, timezone sensor changes and
+options edits (each a full reload) is played against them. The test reports
+the latency of each kind of operation and how long the event loop was
+blocked. Wall-clock budgets depend on the machine, so they are only
+enforced when MEDICINE_TRACKER_LOAD_BUDGETS is set.
+
+Run with ``pytest tests/test_load.py -s`` to see the report.
+"""
+import asyncio
+from datetime import timedelta
+import os
+import random
+import time
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.medicine_tracker.const import (
+    DOMAIN, CONF_MEDICINES, CONF_PATIENT, CONF_NAME, CONF_SCHEDULE_TIME,
+    CONF_SCHEDULE_DAYS, CONF_TIME_MODE, CONF_TZ_SENSOR, MODE_HOME_TIME,
+    MODE_LOCAL_TIME,
+)
+from custom_components.medicine_tracker.regimen import (
+    async_apply, entry_medicines, shift_times,
+)
+from custom_components.medicine_tracker.zone import MIN_ZONE_INTERVAL, ZONE_DEBOUNCE
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry, async_fire_time_changed,
+)
+
+SEED = 20240601
+PATIENTS = 8
+MEDICINES = 25  # Per patient
+OPERATIONS = 600
+CONCURRENCY = 32  # Operations in flight at once
+
+# Share of each operation in the mix
+MIX = {"take": 0.6, "reset": 0.1, "tz": 0.2, "edit": 0.1}
+
+ZONES = ["Europe/London", "America/New_York", "Asia/Kolkata", "Australia/Sydney"]
+
+# Budgets, in seconds, enforced only if this environment variable is set
+BUDGETS_ENV = "MEDICINE_TRACKER_LOAD_BUDGETS"
+P99_BUDGET = {"take": 0.25, "reset": 0.25, "tz": 0.25, "edit": 2.0}
+MAX_BLOCK_BUDGET = 0.5
+
+MONITOR_INTERVAL = 0.005
+RELOAD_POLL = 0.001  # Seconds between checks for a reload or zone change
+RELOAD_TIMEOUT = 30  # Seconds a reload or zone change may take at all
+# Time jump that lets any pending zone change through its debounce
+ZONE_SETTLE = timedelta(seconds=MIN_ZONE_INTERVAL + ZONE_DEBOUNCE + 1)
+
+
+class LoopMonitor:
+    """Measures how late the event loop wakes a sleeping task."""
+
+    def __init__(self) -> None:
+        self.lags: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(MONITOR_INTERVAL)
+            self.lags.append(max(time.perf_counter() - started - MONITOR_INTERVAL, 0))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _entry(patient: int) -> MockConfigEntry:
+    medicines = {}
+    for index in range(MEDICINES):
+        medicines[f"med{index}"] = {
+            CONF_NAME: f"Load {patient} {index}",
+            CONF_SCHEDULE_TIME: f"{index % 24:02d}:{index * 7 % 60:02d}:00",
+            CONF_SCHEDULE_DAYS: ["mon", "wed", "fri"] if index % 3 else [],
+            CONF_TIME_MODE: MODE_LOCAL_TIME if index % 2 else MODE_HOME_TIME,
+        }
+    return MockConfigEntry(domain=DOMAIN, entry_id=f"load_{patient}", data={
+        CONF_PATIENT: f"person.load_{patient}",
+        CONF_TZ_SENSOR: f"sensor.load_{patient}_time_zone",
+        CONF_MEDICINES: medicines,
+    })
+
+
+def _entity_id(patient: int, index: int) -> str:
+    return f"sensor.load_{patient}_{index}"
+
+
+async def test_household_load(hass: HomeAssistant):
+    """Test concurrent service traffic stays inside latency and blocking budgets."""
+    rng = random.Random(SEED)
+
+    entries = []
+    for patient in range(PATIENTS):
+        hass.states.async_set(f"sensor.load_{patient}_time_zone", rng.choice(ZONES))
+        entry = _entry(patient)
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        entries.append(entry)
+    await hass.async_block_till_done()
+    assert hass.states.get(_entity_id(PATIENTS - 1, MEDICINES - 1)) is not None
+
+    kinds = list(MIX)
+    # Every random value is drawn here, so the mix does not depend on how
+    # the operations happen to be scheduled
+    operations = []
+    for _ in range(OPERATIONS):
+        kind = rng.choices(kinds, weights=list(MIX.values()))[0]
+        value = {"tz": rng.choice(ZONES), "edit": rng.choice([-30, 30])}.get(kind)
+        operations.append((kind, rng.randrange(PATIENTS), rng.randrange(MEDICINES), value))
+
+    async def run(kind: str, patient: int, index: int, value) -> float:
+        started = time.perf_counter()
+        if kind == "take":
+            await hass.services.async_call(
+                DOMAIN, "take_medicine", {"entity_id": _entity_id(patient, index)}, blocking=True
+            )
+        elif kind == "reset":
+            await hass.services.async_call(
+                DOMAIN, "reset_history", {"entity_id": _entity_id(patient, index)}, blocking=True
+            )
+        elif kind == "tz":
+            # Wait for the zone to take effect, jumping past the debounce,
+            # unless another operation reports a different zone first
+            sensor = f"sensor.load_{patient}_time_zone"
+            hass.states.async_set(sensor, value)
+            async with asyncio.timeout(RELOAD_TIMEOUT):
+                while (
+                    hass.states.get(sensor).state == value
+                    and entries[patient].runtime_data.zone.zone_name != value
+                ):
+                    async_fire_time_changed(hass, dt_util.utcnow() + ZONE_SETTLE)
+                    await asyncio.sleep(RELOAD_POLL)
+        else:
+            entry = entries[patient]
+            previous = entry.runtime_data
+            async_apply(hass, entry, shift_times(entry_medicines(entry), value))
+            # Wait for this entry's reload only, not every task in flight
+            async with asyncio.timeout(RELOAD_TIMEOUT):
+                while (
+                    entry.runtime_data is previous
+                    or entry.state is not ConfigEntryState.LOADED
+                ):
+                    await asyncio.sleep(RELOAD_POLL)
+        return time.perf_counter() - started
+
+    latencies: dict[str, list[float]] = {kind: [] for kind in kinds}
+    slots = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(kind: str, patient: int, index: int, value) -> None:
+        async with slots:
+            latencies[kind].append(await run(kind, patient, index, value))
+
+    monitor = LoopMonitor()
+    monitor.start()
+    try:
+        wall = time.perf_counter()
+        await asyncio.gather(*(bounded(*operation) for operation in operations))
+        await hass.async_block_till_done()
+        wall = time.perf_counter() - wall
+        await monitor.stop()
+
+        lines = [
+            f"{PATIENTS} patients x {MEDICINES} medicines, {OPERATIONS} operations "
+            f"({CONCURRENCY} in flight) in {wall:.2f}s",
+            f"{'operation':<8} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}",
+        ]
+        for kind, values in latencies.items():
+            if values:
+                lines.append(
+                    f"{kind:<8} {len(values):>6} "
+                    + " ".join(f"{_percentile(values, q) * 1000:>8.1f}" for q in (0.5, 0.95, 0.99, 1.0))
+                )
+        blocked = [lag for lag in monitor.lags if lag > MONITOR_INTERVAL]
+        lines.append(
+            f"event loop: max lag {max(monitor.lags, default=0) * 1000:.1f}ms, "
+            f"{len(blocked)} stalls > {MONITOR_INTERVAL * 1000:.0f}ms totalling "
+            f"{sum(blocked) * 1000:.1f}ms"
+        )
+        print("\n" + "\n".join(lines))
+
+        # Every entry survived the churn, and zone changes got through
+        for entry in entries:
+            assert len(entry.runtime_data.sensors) == MEDICINES
+        assert any(entry.runtime_data.zone.changes for entry in entries)
+
+        if os.environ.get(BUDGETS_ENV):
+            for kind, values in latencies.items():
+                if values:
+                    assert _percentile(values, 0.99) < P99_BUDGET[kind], lines
+            assert max(monitor.lags, default=0) < MAX_BLOCK_BUDGET, lines
+    finally:
+        await monitor.stop()
+        # Remove the entries so their dose logs are deleted
+        for entry in entries:
+            await hass.config_entries.async_remove(entry.entry_id)
+        await hass.async_block_till_done()
@@ -0,0 +1,151 @@
+"""Tests for Medicine Tracker bulk medicine management."""
+from datetime import date
+
+import pytest
+
+from custom_components.medicine_tracker.const import (
+    CONF_END_DATE, CONF_NAME, CONF_SCHEDULE_DAYS, CONF_SCHEDULE_TIME,
+    CONF_SEPARATE_FROM, CONF_SEPARATION, CONF_START_DATE,
+)
+from custom_components.medicine_tracker.models import Medicine
+from custom_components.medicine_tracker.regimen import (
+    RegimenError,
+    add_medicines,
+    parse_regimen,
+    remove_medicines,
+    rotate_days,
+    shift_times,
+)
+
+REGIMEN_YAML = """
+medicines:
+  - name: Amoxicillin
+    dosage: 500mg
+    time: "08:00"
+    days: daily
+  - name: Vitamin D
+    time: "20:30"
+    days: [Monday, thu]
+"""
+
+
+async def test_parse_regimen_yaml_and_json():
+    """Test YAML and JSON regimens parse to the same medicines."""
+    from_yaml = parse_regimen(REGIMEN_YAML)
+    from_json = parse_regimen(
+        '[{"name": "Amoxicillin", "dosage": "500mg", "time": "08:00", "days": "daily"},'
+        ' {"name": "Vitamin D", "time": "20:30", "days": ["mon", "thu"]}]'
+    )
+
+    assert from_yaml == from_json
+    assert from_yaml[0].time == 8 * 60
+    assert from_yaml[1].days == 0b1001
+
+
+async def test_course_dates_are_dates():
+    """Test course dates are parsed once and stored as ISO strings."""
+    [medicine] = parse_regimen(
+        '[{"name": "Course", "time": "08:00", "start_date": "2024-01-08", "end_date": "2024-01-28"}]'
+    )
+
+    assert (medicine.start_date, medicine.end_date) == (date(2024, 1, 8), date(2024, 1, 28))
+    data = medicine.as_dict()
+    assert (data[CONF_START_DATE], data[CONF_END_DATE]) == ("2024-01-08", "2024-01-28")
+    assert Medicine.from_dict(data) == medicine
+
+
+@pytest.mark.parametrize(
+    "regimen",
+    [
+        "not: [valid",
+        "[]",
+        '[{"name": "No Time"}]',
+        '[{"name": "Bad Day", "time": "08:00", "days": ["someday"]}]',
+        '[{"name": "Bad Day", "time": "08:00", "days": ["monkey"]}]',
+        '[{"name": "Bad Day", "time": "08:00", "days": "sunshine"}]',
+        '[{"name": "Bad Time", "time": "25:00"}]',
+        '[{"name": "Too Many", "time": "08:00", "max_daily": 11}]',
+        '[{"name": "Backwards", "time": "08:00", "start_date": "2024-02-01", "end_date": "2024-01-01"}]',
+    ],
+)
+async def test_parse_regimen_invalid(regimen):
+    """Test invalid regimens are rejected as a whole."""
+    with pytest.raises(RegimenError):
+        parse_regimen(regimen)
+
+
+async def test_add_medicines_assigns_new_ids():
+    """Test imported medicines are added under fresh ids."""
+    current = {"existing": {CONF_NAME: "Existing", CONF_SCHEDULE_TIME: 480}}
+
+    added = add_medicines(current, parse_regimen(REGIMEN_YAML))
+    replaced = add_medicines(current, parse_regimen(REGIMEN_YAML), replace=True)
+
+    assert len(added) == 3 and "existing" in added
+    assert len(replaced) == 2 and "existing" not in replaced
+
+
+async def test_cloned_separations_follow_new_ids():
+    """Test separations survive a copy only between medicines copied together."""
+    iron = Medicine(name="Iron", separate_from=("thyroid", "calcium"), separation=240)
+    thyroid = Medicine(name="Thyroid")
+
+    added = add_medicines({}, [iron, thyroid], source_ids=["iron", "thyroid"])
+    ids = {data[CONF_NAME]: med_id for med_id, data in added.items()}
+    assert added[ids["Iron"]][CONF_SEPARATE_FROM] == [ids["Thyroid"]]
+
+    # Copied alone, the separation has nothing to refer to
+    alone = next(iter(add_medicines({}, [iron], source_ids=["iron"]).values()))
+    assert CONF_SEPARATE_FROM not in alone
+    assert CONF_SEPARATION not in alone
+
+
+async def test_remove_medicines_drops_separations():
+    """Test removing a medicine removes it from the others' separations."""
+    current = {
+        "iron": Medicine(
+            name="Iron", separate_from=("thyroid",), separation=240
+        ).as_dict(),
+        "calcium": Medicine(
+            name="Calcium", separate_from=("thyroid", "iron"), separation=120
+        ).as_dict(),
+        "thyroid": Medicine(name="Thyroid").as_dict(),
+    }
+
+    remaining = remove_medicines(current, ["thyroid"])
+
+    assert list(remaining) == ["iron", "calcium"]
+    assert CONF_SEPARATE_FROM not in remaining["iron"]
+    assert CONF_SEPARATION not in remaining["iron"]
+    assert remaining["calcium"][CONF_SEPARATE_FROM] == ["iron"]
+    assert remaining["calcium"][CONF_SEPARATION] == 120
+
+
+async def test_rotate_days():
+    """Test weekday masks rotate around the week."""
+    assert rotate_days(0b0000001, 1) == 0b0000010  # Mon -> Tue
+    assert rotate_days(0b1000000, 1) == 0b0000001  # Sun -> Mon
+    assert rotate_days(0b0000001, -1) == 0b1000000  # Mon -> Sun
+    assert rotate_days(0b1111111, 3) == 0b1111111
+
+
+async def test_shift_times_crosses_midnight():
+    """Test shifting past midnight moves the dose to the next weekday."""
+    current = {
+        "late": {CONF_NAME: "Late", CONF_SCHEDULE_TIME: 23 * 60 + 30, CONF_SCHEDULE_DAYS: 0b1},
+        "early": {CONF_NAME: "Early", CONF_SCHEDULE_TIME: 6 * 60, CONF_SCHEDULE_DAYS: 0b1},
+    }
+
+    shifted = shift_times(current, 60)
+
+    assert shifted["late"][CONF_SCHEDULE_TIME] == 30
+    assert shifted["late"][CONF_SCHEDULE_DAYS] == 0b10
+    assert shifted["early"][CONF_SCHEDULE_TIME] == 7 * 60
+    assert shifted["early"][CONF_SCHEDULE_DAYS] == 0b1
+
+    only_early = shift_times(current, -60, ["early"])
+    assert only_early["late"] == current["late"]
+    assert only_early["early"][CONF_SCHEDULE_TIME] == 5 * 60
+
+    with pytest.raises(RegimenError):
+        shift_times(current, 60, ["missing"])
@@ -0,0 +1,73 @@
+"""Tests for Medicine Tracker dose rules."""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from custom_components.medicine_tracker.models import Medicine
+from custom_components.medicine_tracker.rules import (
+    RULE_MAX_DAILY,
+    RULE_MIN_INTERVAL,
+    RULE_SPACING,
+    RuleIndex,
+)
+
+BASE = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def _history(histories):
+    return lambda med_id: histories.get(med_id, [])
+
+
+async def test_no_rules_are_not_indexed():
+    """Test medicines without rules are left out of the index."""
+    index = RuleIndex({"a": Medicine(name="A"), "b": Medicine(name="B", max_daily=2)})
+
+    assert len(index) == 1
+    assert index.get("a") is None
+    assert index.check("a", BASE, _history({"a": [BASE]}), timezone.utc) == []
+
+
+async def test_min_interval():
+    """Test doses closer than the minimum interval are reported, either side."""
+    index = RuleIndex({"a": Medicine(name="A", min_interval=240)})
+    history = _history({"a": [BASE]})
+
+    too_soon = index.check("a", BASE + timedelta(hours=3), history, timezone.utc)
+    assert [violation.rule for violation in too_soon] == [RULE_MIN_INTERVAL]
+
+    # A backdated dose just before an existing one counts too
+    assert index.check("a", BASE - timedelta(hours=1), history, timezone.utc)
+    assert index.check("a", BASE + timedelta(hours=4), history, timezone.utc) == []
+
+
+async def test_max_daily_uses_local_day():
+    """Test the daily maximum counts doses within the patient's local day."""
+    tz = ZoneInfo("America/New_York")
+    index = RuleIndex({"a": Medicine(name="A", max_daily=2)})
+    # 08:00 and 20:00 New York time on Jan 1
+    day = datetime(2024, 1, 1, 8, 0, tzinfo=tz)
+    history = _history({"a": [day, day + timedelta(hours=12)]})
+
+    # 23:00 local is already Jan 2 in UTC, where only one dose was taken
+    late = index.check("a", day + timedelta(hours=15), history, tz)
+    assert [violation.rule for violation in late] == [RULE_MAX_DAILY]
+
+    # 00:30 on Jan 2 starts a new local day
+    assert index.check("a", day + timedelta(hours=16, minutes=30), history, tz) == []
+
+
+async def test_spacing_is_symmetric():
+    """Test spacing declared on one medicine applies to both, largest gap wins."""
+    index = RuleIndex({
+        "iron": Medicine(name="Iron", separate_from=("thyroid",), separation=120),
+        "thyroid": Medicine(name="Thyroid", separate_from=("iron", "gone"), separation=240),
+    })
+    history = _history({"thyroid": [BASE], "iron": [BASE]})
+
+    assert index.get("iron").spacing == {"thyroid": timedelta(hours=4)}
+    assert index.get("thyroid").spacing == {"iron": timedelta(hours=4)}
+
+    violations = index.check("iron", BASE + timedelta(hours=3), history, timezone.utc)
+    assert [(violation.rule, violation.other) for violation in violations] == [
+        (RULE_SPACING, "thyroid")
+    ]
+    assert index.check("iron", BASE + timedelta(hours=5), history, timezone.utc) == []
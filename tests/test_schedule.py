@@ -0,0 +1,254 @@
+"""Property and fuzz tests for the Medicine Tracker schedule solver.
+
+Every optimized next-due computation is checked against a deliberately slow
+reference model over randomly generated schedules, timezones (biased towards
+DST transitions) and dose histories, and must stay inside a per-call budget.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+import random
+import time as monotonic
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from custom_components.medicine_tracker import schedule
+
+SEED = 20240101
+CASES = 3000
+
+# Mean wall-clock budget for one next_due() + classify() call, in seconds.
+PER_CALL_BUDGET = 100e-6
+
+ZONES = [
+    "UTC",
+    "America/New_York",
+    "America/Los_Angeles",
+    "America/St_Johns",
+    "America/Santiago",
+    "Europe/London",
+    "Europe/Berlin",
+    "Australia/Sydney",
+    "Australia/Lord_Howe",
+    "Pacific/Chatham",
+    "Asia/Kolkata",
+]
+
+# Implementations under test: (name, next_due, classify)
+IMPLEMENTATIONS = [
+    ("schedule", schedule.next_due, schedule.classify),
+]
+
+
+def _normalize(value: datetime) -> datetime:
+    """Round-trip through UTC so gap times resolve to a real wall time."""
+    return value.astimezone(timezone.utc).astimezone(value.tzinfo)
+
+
+def _reference_next_due(now, at, days, last_taken):
+    """Slow, literal model of the schedule rules."""
+    tz = now.tzinfo
+    today = now.date()
+
+    def scheduled(day: date) -> bool:
+        valid = [d for d in days if d in schedule.WEEKDAYS]
+        return not valid or day.strftime("%a").lower() in valid
+
+    taken_today = False
+    if last_taken is not None:
+        taken_today = last_taken.astimezone(tz).date() == today
+
+    day = today
+    if taken_today or not scheduled(day):
+        day += timedelta(days=1)
+        while not scheduled(day):
+            day += timedelta(days=1)
+
+    return _normalize(
+        datetime(day.year, day.month, day.day, at.hour, at.minute, tzinfo=tz)
+    )
+
+
+def _reference_classify(due, now):
+    """Slow model of the due classification, compared as instants."""
+    due, now = _normalize(due), _normalize(now)
+    if due.timestamp() < now.timestamp():
+        return schedule.DUE_OVERDUE
+    if due.date() == now.date():
+        return schedule.DUE_TODAY
+    if due.date() == now.date() + timedelta(days=1):
+        return schedule.DUE_TOMORROW
+    return schedule.DUE_LATER
+
+
+@lru_cache(maxsize=None)
+def _transitions(zone: str, year: int) -> tuple[datetime, ...]:
+    """UTC instants (to the hour) where the zone's offset changes."""
+    tz = ZoneInfo(zone)
+    found = []
+    instant = datetime(year, 1, 1, tzinfo=timezone.utc)
+    previous = instant.astimezone(tz).utcoffset()
+    while instant.year == year:
+        instant += timedelta(hours=1)
+        offset = instant.astimezone(tz).utcoffset()
+        if offset != previous:
+            found.append(instant)
+            previous = offset
+    return tuple(found)
+
+
+def _random_case(rng: random.Random):
+    """Generate one (now, at, days, last_taken) case."""
+    zone = rng.choice(ZONES)
+    tz = ZoneInfo(zone)
+    year = rng.choice([2024, 2025, 2026])
+    transitions = _transitions(zone, year)
+
+    if transitions and rng.random() < 0.5:
+        # Land within two days (often within the hour) of a DST transition
+        anchor = rng.choice(transitions)
+        spread = rng.choice([90, 2880])
+        instant = anchor + timedelta(minutes=rng.randint(-spread, spread))
+    else:
+        instant = datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(
+            minutes=rng.randint(0, 364 * 1440)
+        )
+    now = instant.astimezone(tz)
+
+    roll = rng.random()
+    if roll < 0.2:
+        # Within the current hour, so repeated (folded) hours get compared
+        at = time(now.hour, rng.randint(0, 59))
+    elif roll < 0.5:
+        # Early-morning times are the ones DST gaps and folds swallow
+        at = time(rng.randint(0, 3), rng.choice([0, 15, 30, 45]))
+    else:
+        at = time(rng.randint(0, 23), rng.randint(0, 59))
+
+    days = rng.sample(schedule.WEEKDAYS, rng.randint(0, 7))
+    if rng.random() < 0.05:
+        days.append("xyz")
+
+    history = sorted(
+        now - timedelta(minutes=rng.randint(0, 10 * 1440))
+        for _ in range(rng.randint(0, 10))
+    )
+    last_taken = history[-1] if history else None
+    if last_taken is not None and rng.random() < 0.3:
+        last_taken = last_taken.astimezone(timezone.utc)
+
+    return now, at, days, last_taken
+
+
+def _cases():
+    rng = random.Random(SEED)
+    return [_random_case(rng) for _ in range(CASES)]
+
+
+async def test_weekday_mask():
+    """Test day lists convert to bitmasks."""
+    assert schedule.weekday_mask([]) == schedule.ALL_DAYS
+    assert schedule.weekday_mask(None) == schedule.ALL_DAYS
+    assert schedule.weekday_mask(["xyz"]) == schedule.ALL_DAYS
+    assert schedule.weekday_mask(["mon"]) == 0b1
+    assert schedule.weekday_mask(["mon", "sun", "xyz"]) == 0b1000001
+
+
+@pytest.mark.parametrize(
+    "name,next_due,classify", IMPLEMENTATIONS, ids=[i[0] for i in IMPLEMENTATIONS]
+)
+async def test_matches_reference(name, next_due, classify):
+    """Test every implementation agrees with the reference model."""
+    for now, at, days, last_taken in _cases():
+        mask = schedule.weekday_mask(days)
+        expected = _reference_next_due(now, at, days, last_taken)
+        actual = next_due(now, at, mask, last_taken)
+
+        context = f"{name}: now={now.isoformat()} tz={now.tzinfo} at={at} days={days} last={last_taken}"
+        assert actual.timestamp() == expected.timestamp(), context
+        assert classify(actual, now) == _reference_classify(expected, now), context
+
+
+@pytest.mark.parametrize(
+    "name,next_due,classify", IMPLEMENTATIONS, ids=[i[0] for i in IMPLEMENTATIONS]
+)
+async def test_performance_budget(name, next_due, classify):
+    """Test every implementation stays inside the per-call budget."""
+    cases = [
+        (now, at, schedule.weekday_mask(days), last_taken)
+        for now, at, days, last_taken in _cases()
+    ]
+
+    start = monotonic.perf_counter()
+    for now, at, mask, last_taken in cases:
+        classify(next_due(now, at, mask, last_taken), now)
+    per_call = (monotonic.perf_counter() - start) / len(cases)
+
+    assert per_call < PER_CALL_BUDGET, (
+        f"{name}: {per_call * 1e6:.1f}us per call exceeds "
+        f"{PER_CALL_BUDGET * 1e6:.0f}us budget"
+    )
+
+
+async def test_dst_gap_resolves_forward():
+    """Test a dose inside the spring-forward gap lands after the gap."""
+    tz = ZoneInfo("America/New_York")
+    now = datetime(2024, 3, 10, 0, 30, tzinfo=tz)
+
+    due = schedule.next_due(now, time(2, 30), schedule.ALL_DAYS, None)
+
+    assert due.timestamp() == datetime(2024, 3, 10, 7, 30, tzinfo=timezone.utc).timestamp()
+
+
+def _reference_missed_days(after, until, days, taken, floor):
+    """Slow model of the missed-day sweep: check every day one by one."""
+    valid = [d for d in days if d in schedule.WEEKDAYS]
+    missed = []
+    for ordinal in range(after + 1, until + 1):
+        day = date.fromordinal(ordinal)
+        if valid and day.strftime("%a").lower() not in valid:
+            continue
+        if ordinal in taken or (floor is not None and ordinal < floor):
+            continue
+        missed.append(ordinal)
+    return missed
+
+
+async def test_missed_days_matches_reference():
+    """Test the merge-join sweep agrees with a day-by-day scan."""
+    rng = random.Random(SEED)
+    base = date(2024, 1, 1).toordinal()
+    for _ in range(CASES):
+        after = base + rng.randint(0, 365)
+        until = after + rng.randint(0, 60)
+        days = rng.sample(schedule.WEEKDAYS, rng.randint(0, 7))
+        taken = sorted({after + rng.randint(-5, 65) for _ in range(rng.randint(0, 10))})
+        floor = taken[0] if taken and rng.random() < 0.3 else None
+
+        assert schedule.missed_days(
+            after, until, schedule.weekday_mask(days), taken, floor
+        ) == _reference_missed_days(after, until, days, taken, floor)
+
+
+async def test_overrides_expire_with_their_occurrence():
+    """Test snooze and skip overrides only apply to their own occurrence."""
+    tz = ZoneInfo("Europe/Berlin")
+    now = datetime(2024, 3, 30, 9, 0, tzinfo=tz)
+    due = schedule.next_due(now, time(8, 0), schedule.ALL_DAYS, None)
+
+    snoozed = schedule.DueOverride(due, due + timedelta(hours=2))
+    assert schedule.apply_override(due, time(8, 0), schedule.ALL_DAYS, snoozed) == (
+        snoozed.until, snoozed
+    )
+
+    # Skipping today's dose moves on to tomorrow's, across the DST change
+    skipped = schedule.DueOverride(due)
+    effective, override = schedule.apply_override(due, time(8, 0), schedule.ALL_DAYS, skipped)
+    assert effective.timestamp() == datetime(2024, 3, 31, 6, 0, tzinfo=timezone.utc).timestamp()
+    assert override is skipped
+
+    # Once the next occurrence is due, the override is dropped
+    tomorrow = schedule.next_due(now + timedelta(days=1), time(8, 0), schedule.ALL_DAYS, None)
+    assert schedule.apply_override(tomorrow, time(8, 0), schedule.ALL_DAYS, skipped) == (
+        tomorrow, None
+    )
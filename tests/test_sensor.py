@@ -4,14 +4,22 @@ from unittest.mock import patch, MagicMock
 import pytest
 from homeassistant.util import dt as dt_util
 from homeassistant.const import STATE_UNKNOWN
+from homeassistant.core import State
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import device_registry as dr, entity_registry as er
 
 from custom_components.medicine_tracker.const import (
     DOMAIN, CONF_MEDICINES, CONF_PATIENT, CONF_NAME, CONF_ICON,
     CONF_DOSAGE, CONF_SCHEDULE_TIME, CONF_SCHEDULE_DAYS,
-    CONF_TIME_MODE, CONF_TZ_SENSOR, MODE_HOME_TIME, MODE_LOCAL_TIME
+    CONF_TIME_MODE, CONF_TZ_SENSOR, MODE_HOME_TIME, MODE_LOCAL_TIME,
+    CONF_MIN_INTERVAL, CONF_SEPARATE_FROM, CONF_SEPARATION,
+    CONF_RULE_ACTION, RULE_ACTION_WARN,
+    CONF_START_DATE, CONF_END_DATE, CONF_COURSE_DOSES,
 )
 
-from pytest_homeassistant_custom_component.common import MockConfigEntry, async_fire_time_changed
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry, async_capture_events, async_fire_time_changed, mock_restore_cache,
+)
 from homeassistant.helpers.entity_component import async_update_entity
 
 async def test_sensor_setup(hass):
@@ -67,8 +75,10 @@ async def test_sensor_state_calculations(hass):
 
         # 1. Check "Due at 08:00 AM"
         state = hass.states.get("sensor.morning_pill")
-        assert "Due at 8 AM" in state.state
+        assert state.state == "due_today"
+        assert state.attributes["label"] == "Due at 8 AM"
         assert state.attributes["next_due"] == now.replace(hour=8).isoformat()
+        assert state.attributes["due_at"] == int(now.replace(hour=8).timestamp())
 
     # 2. Check "Overdue"
     # Advance time to 8:30 AM
@@ -78,7 +88,8 @@ async def test_sensor_state_calculations(hass):
         await async_update_entity(hass, "sensor.morning_pill")
 
         state = hass.states.get("sensor.morning_pill")
-        assert state.state == "Overdue"
+        assert state.state == "overdue"
+        assert state.attributes["label"] == "Overdue"
 
 async def test_mark_taken(hass):
     """Test marking medicine as taken."""
@@ -104,7 +115,7 @@ async def test_mark_taken(hass):
 
         # Initial: Overdue (since 9 > 8)
         state = hass.states.get("sensor.pill")
-        assert state.state == "Overdue"
+        assert state.state == "overdue"
 
         # Call service to take medicine
         await hass.services.async_call(
@@ -116,7 +127,8 @@ async def test_mark_taken(hass):
 
         state = hass.states.get("sensor.pill")
         # Should be due tomorrow now
-        assert state.state == "Due Tomorrow"
+        assert state.state == "due_tomorrow"
+        assert state.attributes["label"] == "Due Tomorrow"
         assert len(state.attributes["history"]) == 1
 
 async def test_schedule_days(hass):
@@ -149,8 +161,306 @@ async def test_schedule_days(hass):
         state = hass.states.get("sensor.weekly_pill")
         # Today is Mon. Next Wed is 2 days away.
         # "Due Wednesday"
-        assert state.state == "Due Wednesday"
+        assert state.state == "due_later"
+        assert state.attributes["label"] == "Due Wednesday"
 
         # Check next due attribute
         next_due = dt_util.parse_datetime(state.attributes["next_due"])
         assert next_due.weekday() == 2 # Wednesday
+
+async def test_missed_doses_backfilled_after_restart(hass):
+    """Test the sweep records doses missed while Home Assistant was down."""
+    tz = dt_util.DEFAULT_TIME_ZONE
+    now = datetime(2024, 1, 5, 9, 0, tzinfo=tz)
+    mock_restore_cache(hass, [
+        State("sensor.daily_pill", "overdue", {
+            "history": [datetime(2024, 1, 2, 8, 5, tzinfo=tz).isoformat()],
+            "last_sweep": "2024-01-01",
+        })
+    ])
+    missed_events = async_capture_events(hass, f"{DOMAIN}_dose_missed")
+
+    with patch("homeassistant.util.dt.now", return_value=now):
+        entry_data = {
+            CONF_PATIENT: "person.test_user",
+            CONF_MEDICINES: {
+                "med1": {
+                    CONF_NAME: "Daily Pill",
+                    CONF_SCHEDULE_TIME: "08:00:00",
+                    CONF_SCHEDULE_DAYS: [],
+                    CONF_TIME_MODE: MODE_HOME_TIME,
+                    CONF_ICON: "mdi:pill",
+                }
+            }
+        }
+
+        entry = MockConfigEntry(domain=DOMAIN, data=entry_data)
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        state = hass.states.get("sensor.daily_pill")
+        assert state.attributes["missed"] == [
+            datetime(2024, 1, 3, 8, 0, tzinfo=tz).isoformat(),
+            datetime(2024, 1, 4, 8, 0, tzinfo=tz).isoformat(),
+        ]
+        assert state.attributes["last_sweep"] == "2024-01-04"
+        assert len(missed_events) == 2
+
+        # A late dose for the 3rd, synced from the phone, cancels that miss
+        await hass.services.async_call(
+            DOMAIN,
+            "log_doses",
+            {"events": [{
+                "entity_id": "sensor.daily_pill",
+                "time_taken": datetime(2024, 1, 3, 8, 30, tzinfo=tz).isoformat(),
+            }]},
+            blocking=True,
+        )
+
+        state = hass.states.get("sensor.daily_pill")
+        assert state.attributes["missed"] == [
+            datetime(2024, 1, 4, 8, 0, tzinfo=tz).isoformat(),
+        ]
+
+async def test_sweep_cursor_never_moves_back(hass):
+    """Test a sweep cursor ahead of the clock is kept rather than rewound."""
+    tz = dt_util.DEFAULT_TIME_ZONE
+    now = datetime(2024, 1, 5, 9, 0, tzinfo=tz)
+    mock_restore_cache(hass, [
+        State("sensor.daily_pill", "overdue", {"last_sweep": "2024-01-06"})
+    ])
+
+    with patch("homeassistant.util.dt.now", return_value=now):
+        entry = MockConfigEntry(domain=DOMAIN, data={
+            CONF_PATIENT: "person.test_user",
+            CONF_MEDICINES: {
+                "med1": {
+                    CONF_NAME: "Daily Pill",
+                    CONF_SCHEDULE_TIME: "08:00:00",
+                    CONF_SCHEDULE_DAYS: [],
+                    CONF_TIME_MODE: MODE_HOME_TIME,
+                    CONF_ICON: "mdi:pill",
+                }
+            }
+        })
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        state = hass.states.get("sensor.daily_pill")
+        assert state.attributes["last_sweep"] == "2024-01-06"
+        assert "missed" not in state.attributes
+
+
+async def test_dose_rules(hass):
+    """Test take_medicine enforces dose rules, blocking or warning."""
+    now = dt_util.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    violations = async_capture_events(hass, f"{DOMAIN}_rule_violation")
+
+    with patch("homeassistant.util.dt.now", return_value=now):
+        entry = MockConfigEntry(domain=DOMAIN, data={
+            CONF_PATIENT: "person.test_user",
+            CONF_MEDICINES: {
+                "iron": {
+                    CONF_NAME: "Iron",
+                    CONF_SCHEDULE_TIME: "08:00:00",
+                    CONF_MIN_INTERVAL: 12 * 60,
+                },
+                "thyroid": {
+                    CONF_NAME: "Thyroid",
+                    CONF_SCHEDULE_TIME: "07:00:00",
+                    CONF_SEPARATE_FROM: ["iron"],
+                    CONF_SEPARATION: 4 * 60,
+                },
+            },
+        })
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        await hass.services.async_call(
+            DOMAIN, "take_medicine", {"entity_id": "sensor.iron"}, blocking=True
+        )
+
+        # Thyroid within 4 hours of iron is rejected and not logged
+        with pytest.raises(ServiceValidationError):
+            await hass.services.async_call(
+                DOMAIN, "take_medicine", {"entity_id": "sensor.thyroid"}, blocking=True
+            )
+        assert "history" not in hass.states.get("sensor.thyroid").attributes
+        assert [event.data["rule"] for event in violations] == ["spacing"]
+
+        # Doses logged after the fact are recorded; rules do not apply to them
+        await hass.services.async_call(
+            DOMAIN,
+            "log_doses",
+            {"events": [{
+                "entity_id": "sensor.thyroid",
+                "time_taken": (now - timedelta(hours=1)).isoformat(),
+            }]},
+            blocking=True,
+        )
+        assert len(hass.states.get("sensor.thyroid").attributes["history"]) == 1
+        assert len(violations) == 1
+
+        # In warn mode the dose is logged and only the event fires
+        hass.config_entries.async_update_entry(
+            entry, options={**entry.options, CONF_RULE_ACTION: RULE_ACTION_WARN}
+        )
+        await hass.async_block_till_done()
+
+        await hass.services.async_call(
+            DOMAIN, "take_medicine", {"entity_id": "sensor.thyroid"}, blocking=True
+        )
+        assert len(hass.states.get("sensor.thyroid").attributes["history"]) == 2
+        assert len(violations) == 2
+        assert violations[-1].data["blocked"] is False
+
+async def test_snooze_and_skip(hass):
+    """Test snoozing and skipping override the next dose without a reload."""
+    now = dt_util.now().replace(hour=9, minute=0, second=0, microsecond=0)
+
+    with patch("homeassistant.util.dt.now", return_value=now):
+        entry = MockConfigEntry(domain=DOMAIN, data={
+            CONF_PATIENT: "person.test_user",
+            CONF_MEDICINES: {
+                "med1": {CONF_NAME: "Pill", CONF_SCHEDULE_TIME: "08:00:00"},
+            },
+        })
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        assert hass.states.get("sensor.pill").state == "overdue"
+
+        await hass.services.async_call(
+            DOMAIN, "snooze_medicine",
+            {"entity_id": "sensor.pill", "duration": {"minutes": 30}},
+            blocking=True,
+        )
+        state = hass.states.get("sensor.pill")
+        assert state.state == "due_today"
+        assert state.attributes["label"] == "Due at 9:30 AM"
+        assert state.attributes["snoozed_until"] == now.replace(minute=30).isoformat()
+
+    # The deadline timer brings the snoozed dose back at 9:30
+    now = now.replace(minute=31)
+    with patch("homeassistant.util.dt.now", return_value=now):
+        async_fire_time_changed(hass, now)
+        await hass.async_block_till_done()
+        assert hass.states.get("sensor.pill").state == "overdue"
+
+        await hass.services.async_call(
+            DOMAIN, "skip_dose", {"entity_id": "sensor.pill"}, blocking=True
+        )
+        state = hass.states.get("sensor.pill")
+        assert state.state == "due_tomorrow"
+        assert "snoozed_until" not in state.attributes
+        assert state.attributes["skipped_due"] == now.replace(hour=8, minute=0).isoformat()
+
+        # A skipped dose cannot be snoozed
+        with pytest.raises(ServiceValidationError):
+            await hass.services.async_call(
+                DOMAIN, "snooze_medicine", {"entity_id": "sensor.pill"}, blocking=True
+            )
+
+    # At the next occurrence the skip has expired, and was not a miss
+    now = now + timedelta(days=1)
+    with patch("homeassistant.util.dt.now", return_value=now):
+        async_fire_time_changed(hass, now)
+        await hass.async_block_till_done()
+        state = hass.states.get("sensor.pill")
+        assert state.state == "overdue"
+        assert "skipped_due" not in state.attributes
+        assert "missed" not in state.attributes
+
+async def test_timestamp_companions(hass):
+    """Test next-due and last-taken timestamp sensors follow the medicine."""
+    now = dt_util.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    with patch("homeassistant.util.dt.now", return_value=now):
+        entry = MockConfigEntry(domain=DOMAIN, title="Medicines for Test", data={
+            CONF_PATIENT: "person.test_user",
+            CONF_MEDICINES: {
+                "med1": {CONF_NAME: "Pill", CONF_SCHEDULE_TIME: "08:00:00"},
+            },
+        })
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        next_due = hass.states.get("sensor.pill_next_due")
+        assert next_due.attributes["device_class"] == "timestamp"
+        assert dt_util.parse_datetime(next_due.state) == now.replace(hour=8)
+        assert hass.states.get("sensor.pill_last_taken").state == STATE_UNKNOWN
+
+        await hass.services.async_call(
+            DOMAIN, "take_medicine", {"entity_id": "sensor.pill"}, blocking=True
+        )
+        await hass.async_block_till_done()
+
+        assert dt_util.parse_datetime(hass.states.get("sensor.pill_last_taken").state) == now
+        assert dt_util.parse_datetime(
+            hass.states.get("sensor.pill_next_due").state
+        ) == now.replace(hour=8) + timedelta(days=1)
+
+    # All three sensors belong to the patient's device
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, entry.entry_id)})
+    assert device.name == "Medicines for Test"
+    entities = er.async_entries_for_device(er.async_get(hass), device.id)
+    assert {entity.entity_id for entity in entities} == {
+        "sensor.pill", "sensor.pill_next_due", "sensor.pill_last_taken",
+    }
+
+async def test_course_lifecycle(hass):
+    """Test courses wait for their start and go dormant once completed."""
+    now = dt_util.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    today = now.date()
+
+    with patch("homeassistant.util.dt.now", return_value=now):
+        entry = MockConfigEntry(domain=DOMAIN, data={
+            CONF_PATIENT: "person.test_user",
+            CONF_MEDICINES: {
+                "upcoming": {
+                    CONF_NAME: "Upcoming",
+                    CONF_SCHEDULE_TIME: "08:00:00",
+                    CONF_START_DATE: (today + timedelta(days=3)).isoformat(),
+                },
+                "ended": {
+                    CONF_NAME: "Ended",
+                    CONF_SCHEDULE_TIME: "08:00:00",
+                    CONF_END_DATE: (today - timedelta(days=1)).isoformat(),
+                },
+                "short": {
+                    CONF_NAME: "Short",
+                    CONF_SCHEDULE_TIME: "08:00:00",
+                    CONF_COURSE_DOSES: 2,
+                },
+            },
+        })
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        state = hass.states.get("sensor.upcoming")
+        assert state.state == "due_later"
+        assert dt_util.parse_datetime(state.attributes["next_due"]).date() == today + timedelta(days=3)
+
+        assert hass.states.get("sensor.ended").state == "completed"
+
+        for day in (2, 1):
+            await hass.services.async_call(
+                DOMAIN, "take_medicine",
+                {"entity_id": "sensor.short", "time_taken": (now - timedelta(days=day)).isoformat()},
+                blocking=True,
+            )
+        state = hass.states.get("sensor.short")
+        assert state.state == "completed"
+        assert state.attributes["course_taken"] == 2
+        assert "next_due" not in state.attributes
+
+        # Dormant: no deadline timer; nothing polls, active or not
+        sensors = entry.runtime_data.sensors
+        for med_id in ("ended", "short"):
+            assert sensors[med_id]._cancel_deadline is None
+        assert sensors["upcoming"]._cancel_deadline is not None
+        assert not any(sensor.should_poll for sensor in sensors.values())
@@ -0,0 +1,87 @@
+"""Tests for the Medicine Tracker timezone transition tables."""
+from datetime import date, datetime, time, timedelta, timezone
+import random
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from custom_components.medicine_tracker import tztable
+
+ZONES = [
+    "UTC",
+    "America/New_York",
+    "America/Santiago",
+    "Europe/London",
+    "Australia/Lord_Howe",
+    "Pacific/Chatham",
+    "Asia/Kolkata",
+]
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+async def test_offsets_match_zoneinfo():
+    """Test table offsets agree with zoneinfo at random instants."""
+    rng = random.Random(7)
+    for _ in range(2000):
+        tz = ZoneInfo(rng.choice(ZONES))
+        ts = rng.randint(1704067200, 1798761600)  # 2024-01-01 .. 2027-01-01
+        expected = datetime.fromtimestamp(ts, tz).utcoffset().total_seconds()
+        assert tztable.get_table(tz, ts).offset_at(ts) == expected, (tz, ts)
+
+
+async def test_resolve_matches_zoneinfo_defaults():
+    """Test default policies match zoneinfo's fold=0 wall-time resolution."""
+    rng = random.Random(11)
+    for _ in range(2000):
+        tz = ZoneInfo(rng.choice(ZONES))
+        day = date(2024, 1, 1) + timedelta(days=rng.randint(0, 3 * 365))
+        at = time(rng.randint(0, 23), rng.randint(0, 59))
+
+        expected = datetime.combine(day, at, tzinfo=tz).astimezone(timezone.utc)
+        actual = tztable.resolve(day, at, tz)
+
+        assert actual.timestamp() == expected.timestamp(), (tz, day, at)
+        assert actual.tzinfo is tz
+
+
+async def test_transitions_found():
+    """Test a year of New York has exactly its two DST transitions."""
+    table = tztable.get_table(NEW_YORK, datetime(2024, 6, 1).timestamp())
+    utc = [
+        (datetime.fromtimestamp(instant, timezone.utc), before, after)
+        for instant, before, after in table.transitions
+        if instant >= datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+        and instant < datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    ]
+    assert utc == [
+        (datetime(2024, 3, 10, 7, 0, tzinfo=timezone.utc), -18000, -14400),
+        (datetime(2024, 11, 3, 6, 0, tzinfo=timezone.utc), -14400, -18000),
+    ]
+
+
+@pytest.mark.parametrize(
+    "policy,expected",
+    [
+        (tztable.NONEXISTENT_SHIFT_FORWARD, datetime(2024, 3, 10, 7, 30, tzinfo=timezone.utc)),
+        (tztable.NONEXISTENT_GAP_END, datetime(2024, 3, 10, 7, 0, tzinfo=timezone.utc)),
+    ],
+)
+async def test_nonexistent_policy(policy, expected):
+    """Test wall times inside a spring-forward gap follow the policy."""
+    resolved = tztable.resolve(date(2024, 3, 10), time(2, 30), NEW_YORK, nonexistent=policy)
+    assert resolved.timestamp() == expected.timestamp()
+
+
+@pytest.mark.parametrize(
+    "policy,expected",
+    [
+        (tztable.AMBIGUOUS_EARLIEST, datetime(2024, 11, 3, 5, 30, tzinfo=timezone.utc)),
+        (tztable.AMBIGUOUS_LATEST, datetime(2024, 11, 3, 6, 30, tzinfo=timezone.utc)),
+    ],
+)
+async def test_ambiguous_policy(policy, expected):
+    """Test wall times inside a fall-back fold follow the policy."""
+    resolved = tztable.resolve(date(2024, 11, 3), time(1, 30), NEW_YORK, ambiguous=policy)
+    assert resolved.timestamp() == expected.timestamp()
+    assert resolved.hour == 1 and resolved.minute == 30
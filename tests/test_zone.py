@@ -0,0 +1,93 @@
+"""Tests for Medicine Tracker timezone sensor tracking."""
+from datetime import timedelta
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.medicine_tracker.const import (
+    DOMAIN, CONF_MEDICINES, CONF_PATIENT, CONF_NAME, CONF_SCHEDULE_TIME,
+    CONF_TIME_MODE, CONF_TZ_SENSOR, MODE_LOCAL_TIME,
+)
+from custom_components.medicine_tracker.zone import ZONE_DEBOUNCE
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry, async_fire_time_changed,
+)
+
+TZ_SENSOR = "sensor.phone_time_zone"
+
+
+async def _setup(hass: HomeAssistant) -> MockConfigEntry:
+    entry = MockConfigEntry(domain=DOMAIN, entry_id="zone_entry", data={
+        CONF_PATIENT: "person.test_user",
+        CONF_TZ_SENSOR: TZ_SENSOR,
+        CONF_MEDICINES: {
+            "med1": {
+                CONF_NAME: "Travel Pill",
+                CONF_SCHEDULE_TIME: "08:00:00",
+                CONF_TIME_MODE: MODE_LOCAL_TIME,
+            },
+        },
+    })
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+def _due_zone(hass: HomeAssistant) -> str:
+    """UTC offset of the medicine's next due time."""
+    return hass.states.get("sensor.travel_pill").attributes["next_due"][-6:]
+
+
+async def test_zone_changes_are_debounced(hass: HomeAssistant):
+    """Test flaps are ignored and a real change applies once, after the debounce."""
+    hass.states.async_set(TZ_SENSOR, "Asia/Kolkata")
+    entry = await _setup(hass)
+    tracker = entry.runtime_data.zone
+    assert _due_zone(hass) == "+05:30"
+
+    # Losing the phone keeps the last known good zone
+    for state in (STATE_UNKNOWN, STATE_UNAVAILABLE, "Not/AZone", "Asia/Kolkata"):
+        hass.states.async_set(TZ_SENSOR, state)
+        await hass.async_block_till_done()
+    assert _due_zone(hass) == "+05:30"
+
+    # A brief flap to another zone is dropped when it flaps back
+    hass.states.async_set(TZ_SENSOR, "Asia/Tokyo")
+    await hass.async_block_till_done()
+    hass.states.async_set(TZ_SENSOR, "Asia/Kolkata")
+    await hass.async_block_till_done()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=ZONE_DEBOUNCE + 1))
+    await hass.async_block_till_done()
+    assert _due_zone(hass) == "+05:30"
+    assert tracker.changes == 1
+
+    # A zone that holds through the debounce (unknown in between) takes effect
+    hass.states.async_set(TZ_SENSOR, "Asia/Tokyo")
+    await hass.async_block_till_done()
+    hass.states.async_set(TZ_SENSOR, STATE_UNKNOWN)
+    await hass.async_block_till_done()
+    hass.states.async_set(TZ_SENSOR, "Asia/Tokyo")
+    await hass.async_block_till_done()
+    assert _due_zone(hass) == "+05:30"
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=ZONE_DEBOUNCE + 1))
+    await hass.async_block_till_done()
+    assert _due_zone(hass) == "+09:00"
+    assert tracker.changes == 2
+
+
+async def test_last_known_zone_survives_restart(hass: HomeAssistant, hass_storage):
+    """Test the stored zone is used while the sensor is still unknown."""
+    hass_storage[f"{DOMAIN}.zone.zone_entry"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.zone.zone_entry",
+        "data": {"zone": "Asia/Tokyo"},
+    }
+    hass.states.async_set(TZ_SENSOR, STATE_UNKNOWN)
+
+    await _setup(hass)
+
+    assert _due_zone(hass) == "+09:00"